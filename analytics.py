@@ -0,0 +1,232 @@
+"""Headless analytics behind the dashboard pages.
+
+Every metric card and chart on the three pages is computed here as a plain
+function of an aggregate ``Cube`` (see ``data.load_cube``), with no
+Streamlit calls, so the numbers can be reused, profiled, cached or
+batch-generated outside a Streamlit session. The pages only lay out widgets
+and turn these results into figures.
+
+``METRICS`` and ``CHARTS`` name every function (``SECTIONS`` every
+on-demand page section), and ``compute()`` evaluates all of them for one
+filter selection, e.g. for a report::
+
+    results = analytics.compute({"year": ["First year"]})
+    results["charts"]["stress_by_year"]
+"""
+import math
+
+import profiling
+import schema
+from data import load_cube
+from sketch import MetricSketch
+
+# Questions in the lifestyle correlation heatmap (page 2)
+BEHAVIORS = ["sleep_difficulty", "night_waking", "sleep_quality", "device_use", "caffeine", "exercise"]
+BEHAVIOR_LABELS = {**schema.LABELS, "sleep_quality": "Overall sleep quality"}
+
+
+def _proportions(cube, index, columns, name):
+    """Row-normalised crosstab in long form (``index``, ``name``, ``Proportion``)."""
+    crosstab = cube.crosstab(index, columns, normalize="index").dropna(how="all")
+    return crosstab.reset_index().melt(id_vars=index, var_name=name, value_name="Proportion")
+
+
+def _score_axes(frame, index, columns):
+    """Relabel a 2-D table with the numeric scores of its answer levels."""
+    frame = frame.set_axis(schema.score_table(index), axis=0)
+    return frame.set_axis(schema.score_table(columns), axis=1)
+
+
+def _box(cube, dim, by):
+    """Box statistics plus the per-group histogram used for outlier markers."""
+    return {"stats": cube.box_stats(dim, by=by), "counts": cube.counts(by, dim)}
+
+
+# --- Objective 1: sleep distribution ---
+@profiling.profiled("aggregate")
+def sleep_overview(cube):
+    """Metric cards: mean sleep hours and the most common stress, performance and gender."""
+    return {
+        "avg_sleep_hours": cube.mean("sleep_hours_numeric"),
+        "common_stress": cube.mode("stress"),
+        "common_performance": cube.mode("performance"),
+        "majority_gender": cube.mode("gender"),
+    }
+
+
+@profiling.profiled("aggregate")
+def stress_by_year(cube):
+    """Share of each stress level within each year of study (long form)."""
+    return _proportions(cube, "year", "stress", "Stress Level")
+
+
+@profiling.profiled("aggregate")
+def sleep_hours_by_gender(cube):
+    """Box statistics of sleep hours for each gender."""
+    return _box(cube, "sleep_hours", by="gender")
+
+
+@profiling.profiled("aggregate")
+def sleep_quality_by_year(cube):
+    """Share of each sleep-quality rating within each year of study (long form)."""
+    return _proportions(cube, "year", "sleep_quality", "Sleep Quality")
+
+
+# --- Objective 2: lifestyle impact ---
+@profiling.profiled("aggregate")
+def lifestyle_overview(cube):
+    """Metric cards: the most common sleep quality, caffeine, device and exercise answers."""
+    return {
+        "common_sleep_quality": cube.mode("sleep_quality"),
+        "common_caffeine": cube.mode("caffeine"),
+        "common_device_use": cube.mode("device_use"),
+        "common_exercise": cube.mode("exercise"),
+    }
+
+
+@profiling.profiled("aggregate")
+def behavior_correlation(cube, method="spearman", dims=BEHAVIORS):
+    """Correlation matrix of ordinal questions, labelled for display."""
+    matrix = cube.corr(list(dims), method=method)
+    labels = [BEHAVIOR_LABELS[dim] for dim in dims]
+    return matrix.set_axis(labels, axis=0).set_axis(labels, axis=1)
+
+
+@profiling.profiled("aggregate")
+def sleep_hours_by_device_use(cube):
+    """Response counts by sleep hours x device use, on their numeric scales."""
+    return _score_axes(cube.counts("sleep_hours", "device_use"), "sleep_hours", "device_use")
+
+
+@profiling.profiled("aggregate")
+def sleep_quality_by_caffeine(cube):
+    """Share of each sleep-quality rating within each caffeine frequency (long form)."""
+    return _proportions(cube, "caffeine", "sleep_quality", "Sleep Quality")
+
+
+# --- Objective 3: academic performance ---
+@profiling.profiled("aggregate")
+def performance_overview(cube):
+    """Metric cards: the most common performance, concentration, fatigue and sleep impact."""
+    return {
+        "common_performance": cube.mode("performance"),
+        "common_concentration": cube.mode("concentration"),
+        "common_fatigue": cube.mode("fatigue"),
+        "common_sleep_impact": cube.mode("sleep_impact"),
+    }
+
+
+@profiling.profiled("aggregate")
+def performance_by_sleep_impact(cube):
+    """Box statistics of academic performance for each sleep-impact level."""
+    return _box(cube, "performance", by="sleep_impact")
+
+
+@profiling.profiled("aggregate")
+def performance_heatmap(cube):
+    """Mean performance score by concentration difficulty x fatigue, on numeric scales."""
+    return _score_axes(cube.mean("performance_numeric", "concentration", "fatigue"), "concentration", "fatigue")
+
+
+@profiling.profiled("aggregate")
+def performance_by_concentration(cube):
+    """Box statistics and KDE curves of performance for each concentration level."""
+    box = _box(cube, "performance", by="concentration")
+    box["kde"] = cube.kde("performance", by="concentration")
+    return box
+
+
+# --- Drill-down (page 3) ---
+# Questions performance can be grouped by, and how many at once
+DRILL_DOWN_DIMS = [alias for alias in schema.QUESTIONS if alias != "performance"]
+MAX_DRILL_DOWN_DIMS = 4
+DEFAULT_DRILL_DOWN = ["year", "caffeine", "device_use", "stress"]
+
+
+@profiling.profiled("aggregate")
+def performance_drilldown(cube, by=DEFAULT_DRILL_DOWN):
+    """Count, mean and 95% CI of the performance score per combination of ``by`` (long form).
+
+    ``by`` holds one to ``MAX_DRILL_DOWN_DIMS`` of ``DRILL_DOWN_DIMS``; every
+    group is answered from one table over ``by`` plus performance.
+    """
+    by = list(by)
+    if not 1 <= len(by) <= MAX_DRILL_DOWN_DIMS or len(set(by)) != len(by):
+        raise ValueError(f"Drill down by 1 to {MAX_DRILL_DOWN_DIMS} distinct questions, got {by}")
+    unknown = [dim for dim in by if dim not in DRILL_DOWN_DIMS]
+    if unknown:
+        raise ValueError(f"Cannot drill down by {unknown}; expected any of {DRILL_DOWN_DIMS}")
+    return cube.group_stats("performance", by).reset_index()
+
+
+# --- Error bounds of the metric cards (sketch mode) ---
+# Card -> ("mean", measure) or ("mode", question)
+CARDS = {
+    "avg_sleep_hours": ("mean", "sleep_hours_numeric"),
+    "common_stress": ("mode", "stress"),
+    "common_performance": ("mode", "performance"),
+    "majority_gender": ("mode", "gender"),
+    "common_sleep_quality": ("mode", "sleep_quality"),
+    "common_caffeine": ("mode", "caffeine"),
+    "common_device_use": ("mode", "device_use"),
+    "common_exercise": ("mode", "exercise"),
+    "common_concentration": ("mode", "concentration"),
+    "common_fatigue": ("mode", "fatigue"),
+    "common_sleep_impact": ("mode", "sleep_impact"),
+}
+
+
+def metric_bounds(source, metrics):
+    """95% error bound of each card in ``metrics`` as display text.
+
+    Only a ``MetricSketch`` carries what the bounds need; for a cube (sketch
+    mode off) this returns an empty dict.
+    """
+    if not isinstance(source, MetricSketch):
+        return {}
+    bounds = {}
+    for name in metrics:
+        kind, key = CARDS[name]
+        if kind == "mean":
+            bound = source.mean_bound(key)
+            bounds[name] = None if math.isnan(bound) else f"± {bound:.2f} (95% CI)"
+        else:
+            share, bound = source.mode_share(key)
+            bounds[name] = None if math.isnan(share) else f"{share:.0%} of answers ± {bound * 100:.1f} pp"
+    return bounds
+
+
+# --- Batch evaluation ---
+METRICS = {
+    "sleep_overview": sleep_overview,
+    "lifestyle_overview": lifestyle_overview,
+    "performance_overview": performance_overview,
+}
+CHARTS = {
+    "stress_by_year": stress_by_year,
+    "sleep_hours_by_gender": sleep_hours_by_gender,
+    "sleep_quality_by_year": sleep_quality_by_year,
+    "behavior_correlation": behavior_correlation,
+    "sleep_hours_by_device_use": sleep_hours_by_device_use,
+    "sleep_quality_by_caffeine": sleep_quality_by_caffeine,
+    "performance_by_sleep_impact": performance_by_sleep_impact,
+    "performance_heatmap": performance_heatmap,
+    "performance_by_concentration": performance_by_concentration,
+}
+# expander keys of the pages' on-demand sections: one per chart, plus the drill-down
+SECTIONS = [f"{chart}_section" for chart in CHARTS] + ["performance_drilldown_section"]
+
+
+def compute(selection=None, names=None):
+    """Evaluate metrics and chart data for a filter selection.
+
+    Returns ``{"n_rows": ..., "metrics": {...}, "charts": {...}}``; ``names``
+    restricts the result to the given metric/chart names.
+    """
+    cube = load_cube(selection)
+    wanted = set(METRICS) | set(CHARTS) if names is None else set(names)
+    return {
+        "n_rows": cube.n_rows,
+        "metrics": {name: fn(cube) for name, fn in METRICS.items() if name in wanted},
+        "charts": {name: fn(cube) for name, fn in CHARTS.items() if name in wanted},
+    }
@@ -1,25 +1,41 @@
 import streamlit as st
-import pandas as pd
+import filters
+import profiling
+import warmup
 
+# The entrypoint only draws navigation and the sidebar: pandas, Plotly and
+# the data are imported/loaded by the page that needs them (or by the
+# background warm-up), so the first paint does not wait for them.
 st.set_page_config(page_title="Student Survey Dashboard", layout="wide")
 
-# --- Load dataset ---
-@st.cache_data
-def load_data():
-    url = "https://raw.githubusercontent.com/aleya566/assignment/refs/heads/main/Student%20Insomnia%20and%20Educational%20Outcomes%20Dataset.csv"
-    df = pd.read_csv(url)
-    return df
+# --- Opt-in timing of this rerun (SURVEY_PROFILE=1 or ?profile=1) ---
+profiling.start()
 
-df = load_data()
+# --- Load the dataset and precompute every page's aggregates in the background
+# (only on startup and when the dataset version changes) ---
+with profiling.span("warm_up"):
+    warmup.start()
 
 # --- Page imports ---
 home = st.Page("page1_objective1.py", title="Objective 1 – Sleep Distribution", icon=":material/bar_chart:", default=True)
 page2 = st.Page("page2_objective2.py", title="Objective 2 – Lifestyle Impact", icon=":material/self_improvement:")
 page3 = st.Page("page3_objective3.py", title="Objective 3 – Academic Performance", icon=":material/school:")
 
+# --- Sidebar filters (shared by every page through session state) ---
+filters.sidebar()
+
 # --- Navigation setup ---
 pg = st.navigation({
     "Menu": [home, page2, page3]
 })
 
-pg.run()
+try:
+    with profiling.span(f"page.{pg.url_path or 'home'}"):
+        pg.run()
+
+    # Timing panel (only shown while profiling)
+    profiling.finish(pg.title)
+finally:
+    # an exception or an interrupted rerun must still release the profiler
+    # (reruns run on fresh threads, so it would otherwise keep tracemalloc on)
+    profiling.stop()
@@ -0,0 +1,235 @@
+"""Benchmark suite for the load, aggregation and render paths.
+
+    python benchmark.py                                  # 1k, 100k, 1M and 10M rows
+    python benchmark.py --rows 1000 100000 --output bench.json
+
+For every size a synthetic survey export is generated with the real CSV's 15
+question columns and per-question answer distributions (generated files are
+kept in ``--data-dir`` and reused). Each size is then timed in a fresh worker
+process pointed at that file through ``SURVEY_DATA_FILE``, so caches and
+memory never leak from one size into the next.
+
+The worker times the CSV load (cold parse and memory-mapped reload), the
+score columns, every chart and metric dataset in ``analytics`` on a cold
+cube, a filtered view, and each page rendered headlessly with figure
+construction and serialisation per chart. Results are written as one JSON
+document with timings in seconds, figure sizes in bytes and peak RSS.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import data
+import figure_cache
+import schema
+from cube import Cube
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SIZES = [1_000, 100_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(tempfile.gettempdir(), "survey-benchmark")
+GENERATE_CHUNK = 500_000
+PAGES = ["page1_objective1.py", "page2_objective2.py", "page3_objective3.py"]
+# A typical sidebar state, used to time building a filtered view
+SELECTION = {"year": ["First year", "Second year"], "gender": ["Female"]}
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# --- Synthetic data ---
+def answer_distributions(source=data.DATA_FILE):
+    """Share of each answer level per question in the real survey."""
+    df = schema.read_csv(source)
+    return {
+        alias: df[alias].value_counts(normalize=True, sort=False).reindex(levels, fill_value=0).to_numpy()
+        for alias, levels in schema.LEVELS.items()
+    }
+
+
+def generate(n_rows, path, seed=0, distributions=None):
+    """Write a synthetic survey export of ``n_rows`` rows to ``path``.
+
+    Answers are drawn independently per question from the real answer
+    distributions, and written in the original CSV layout.
+    """
+    distributions = distributions or answer_distributions()
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        for start in range(0, n_rows, GENERATE_CHUNK):
+            size = min(GENERATE_CHUNK, n_rows - start)
+            chunk = pd.DataFrame({
+                question: pd.Categorical.from_codes(
+                    rng.choice(len(schema.LEVELS[alias]), size=size, p=distributions[alias]),
+                    dtype=schema.DTYPES[alias],
+                )
+                for alias, question in schema.QUESTIONS.items()
+            })
+            chunk.to_csv(f, index=False, header=start == 0)
+    return path
+
+
+def dataset(n_rows, data_dir=DATA_DIR, seed=0):
+    """Path of the synthetic export for ``n_rows``, generated on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"survey_{n_rows}_{seed}.csv")
+    if not os.path.exists(path):
+        generate(n_rows, path + ".tmp", seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+# --- Timed stages (run inside a worker process) ---
+def bench_load(path):
+    """Cold CSV load (parse + columnar cache write) and memory-mapped reload."""
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.*.arrow")):
+        os.remove(stale)
+    data.clear_cache()
+    _, cold = _timed(data.load_cube)
+    timings = {"load_cold": cold}
+    if not data.is_streaming():
+        data.clear_cache()
+        _, timings["load_mapped"] = _timed(data.load_cube)
+    return timings
+
+
+def bench_aggregates():
+    """Score columns, then every analytics dataset on a cold (freshly built) cube."""
+    timings = {}
+    if data.is_streaming():
+        # only the folded tables exist; queries never scan rows
+        cube = data.load_cube()
+        fresh = lambda: cube  # noqa: E731
+    else:
+        df = data.load_data()
+        prepared, timings["prepare_scores"] = _timed(data.prepare, df)
+        fresh = lambda: Cube(prepared, measures=data.MEASURES)  # noqa: E731
+    for name, fn in {**analytics.METRICS, **analytics.CHARTS}.items():
+        cube = fresh()
+        _, timings[f"analytics.{name}"] = _timed(fn, cube)
+        _, timings[f"analytics.{name}.warm"] = _timed(fn, cube)
+    _, timings["filtered_view"] = _timed(data.load_cube, SELECTION)
+    return timings
+
+
+def bench_pages():
+    """Render each page headlessly.
+
+    ``page.<name>.first_paint`` is the first run with the on-demand sections
+    closed; ``page.<name>`` renders every section with an empty figure
+    cache, and ``.warm`` repeats it.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    # expander keys of the on-demand sections and previews
+    sections = list(analytics.SECTIONS)
+    sections += [f"dataset_preview_{n}" for n in range(1, len(PAGES) + 1)]
+    timings, figures = {}, {}
+    for page in PAGES:
+        name = os.path.splitext(page)[0]
+        figure_cache.clear()
+        app = AppTest.from_file(os.path.join(here, page), default_timeout=600)
+        _, timings[f"page.{name}.first_paint"] = _timed(app.run)
+        figure_cache.clear()
+        for key in sections:
+            app.session_state[key] = True
+        _, timings[f"page.{name}"] = _timed(app.run)
+        _, timings[f"page.{name}.warm"] = _timed(app.run)
+        if app.exception:
+            raise RuntimeError(f"{page} failed: {app.exception[0].message}")
+        for entry in figure_cache.entries():
+            _, serialize = _timed(entry["figure"].to_json)
+            figures[entry["name"]] = {
+                "build_seconds": entry["build_seconds"],
+                "serialize_seconds": serialize,
+                "bytes": entry["bytes"],
+            }
+    return timings, figures
+
+
+def run_worker(path):
+    """Time every stage against ``path`` (the active ``SURVEY_DATA_FILE``)."""
+    timings = bench_load(path)
+    timings.update(bench_aggregates())
+    page_timings, figures = bench_pages()
+    timings.update(page_timings)
+    peak_rss = None
+    if resource is not None:
+        # ru_maxrss is reported in KiB on Linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        "rows": data.load_cube().n_rows,
+        "csv_bytes": os.path.getsize(path),
+        "streaming": data.is_streaming(),
+        "peak_rss_bytes": peak_rss,
+        "timings": timings,
+        "figures": figures,
+    }
+
+
+# --- Driver ---
+def run(sizes=SIZES, data_dir=DATA_DIR, seed=0):
+    """Generate (or reuse) each dataset and benchmark it in its own process."""
+    results = []
+    for n_rows in sizes:
+        path, generate_seconds = _timed(dataset, n_rows, data_dir, seed)
+        env = {**os.environ, "SURVEY_DATA_FILE": path}
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", path],
+            env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark worker failed for {n_rows:,} rows:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result["generate_seconds"] = generate_seconds
+        results.append(result)
+        print(f"{n_rows:>12,} rows: load {result['timings']['load_cold']:.2f}s", file=sys.stderr)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="dataset sizes to benchmark")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where synthetic exports are generated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", metavar="CSV", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker)))
+        return
+    report = json.dumps(run(args.rows, args.data_dir, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
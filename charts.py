@@ -0,0 +1,179 @@
+"""Figure builders for charts drawn from aggregates instead of raw rows.
+
+Box and violin plots are built from per-group statistics (quartiles, fences,
+KDE curves) plus a bounded sample of points, and the drill-down chart from
+per-group means and intervals, so the figure sent to the browser has the
+same size for a thousand responses or a hundred million.
+"""
+import numpy as np
+
+# Upper bound on the individual points drawn per group
+MAX_POINTS = 200
+# Upper bound on the groups drawn in a drill-down chart
+MAX_GROUPS = 40
+
+
+def sample_points(counts, values, max_points=MAX_POINTS, seed=0):
+    """Draw at most ``max_points`` values per group from a (groups x levels) count frame.
+
+    Answers are discrete levels, so sampling from the histogram is
+    equivalent to sampling rows. A fixed seed keeps figures reproducible
+    (and therefore cacheable).
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for group, row in counts.iterrows():
+        weights = row.to_numpy(dtype="float64")
+        n = int(weights.sum())
+        if n == 0:
+            continue
+        if n <= max_points:
+            samples[group] = np.repeat(values, weights.astype(np.int64))
+        else:
+            samples[group] = rng.choice(values, size=max_points, p=weights / n)
+    return samples
+
+
+def _outliers(counts, values, stats):
+    """Distinct answer values outside the whiskers, per group."""
+    outliers = {}
+    for group, row in stats.iterrows():
+        present = counts.loc[group].to_numpy() > 0
+        outside = present & ((values < row["lowerfence"]) | (values > row["upperfence"]))
+        if outside.any():
+            outliers[group] = values[outside]
+    return outliers
+
+
+def box_from_stats(stats, title, colors, legend_title=None, counts=None, values=None):
+    """Box plot with one box per row of ``Cube.box_stats()`` output.
+
+    Plotly draws the boxes from the precomputed quartiles and fences. When
+    the group histograms (``counts``, ``values``) are given, answers beyond
+    the whiskers are drawn as outlier markers, as ``px.box`` does.
+    """
+    import plotly.graph_objects as go
+
+    outliers = {} if counts is None else _outliers(counts, values, stats)
+    fig = go.Figure()
+    for i, (name, row) in enumerate(stats.iterrows()):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            name=str(name),
+            x=[str(name)],
+            q1=[row["q1"]],
+            median=[row["median"]],
+            q3=[row["q3"]],
+            lowerfence=[row["lowerfence"]],
+            upperfence=[row["upperfence"]],
+            mean=[row["mean"]],
+            marker_color=color,
+            legendgroup=str(name),
+        ))
+        if name in outliers:
+            fig.add_trace(go.Scatter(
+                x=[str(name)] * len(outliers[name]),
+                y=outliers[name],
+                mode="markers",
+                marker_color=color,
+                legendgroup=str(name),
+                showlegend=False,
+                hoverinfo="y",
+            ))
+    fig.update_layout(title=title, legend_title_text=legend_title or stats.index.name)
+    return fig
+
+
+def violin_from_aggregates(stats, kde, samples, title, colors, legend_title=None, width=0.8):
+    """Violin plot (with inner box and jittered points) from aggregates.
+
+    ``kde`` comes from ``Cube.kde()``, ``stats`` from ``Cube.box_stats()`` and
+    ``samples`` from ``sample_points()``. Each violin is scaled to the same
+    maximum width, like Plotly's default ``scalemode="width"``.
+    """
+    import plotly.graph_objects as go
+
+    rng = np.random.default_rng(0)
+    names = list(stats.index)
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        color = colors[i % len(colors)]
+        group = str(name)
+        grid, density = kde[name]
+        half = density / density.max() * width / 2 if density.max() > 0 else density
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([i - half, (i + half)[::-1]]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill="toself",
+            mode="lines",
+            line_color=color,
+            opacity=0.6,
+            name=group,
+            legendgroup=group,
+            hoverinfo="name",
+        ))
+        row = stats.loc[name]
+        fig.add_trace(go.Box(
+            x=[i],
+            q1=[row["q1"]],
+            median=[row["median"]],
+            q3=[row["q3"]],
+            lowerfence=[row["lowerfence"]],
+            upperfence=[row["upperfence"]],
+            width=width / 8,
+            marker_color=color,
+            legendgroup=group,
+            showlegend=False,
+            name=group,
+        ))
+        points = samples.get(name)
+        if points is not None and len(points):
+            fig.add_trace(go.Scatter(
+                x=i + rng.uniform(-width / 4, width / 4, size=len(points)),
+                y=points,
+                mode="markers",
+                marker=dict(color=color, size=4, opacity=0.5),
+                legendgroup=group,
+                showlegend=False,
+                hoverinfo="y",
+            ))
+    fig.update_layout(
+        title=title,
+        legend_title_text=legend_title or stats.index.name,
+        xaxis=dict(tickmode="array", tickvals=list(range(len(names))), ticktext=[str(n) for n in names]),
+    )
+    return fig
+
+
+def mean_ci_from_stats(stats, by, title, color, x_title=None, max_groups=MAX_GROUPS):
+    """Dot plot of group means with their confidence intervals, one row per group.
+
+    ``stats`` is ``Cube.group_stats()`` output in long form (``by`` columns
+    plus ``n``, ``mean``, ``ci_low`` and ``ci_high``); the first
+    ``max_groups`` rows are drawn top to bottom.
+    """
+    import plotly.graph_objects as go
+
+    shown = stats.head(max_groups)
+    labels = [" · ".join(str(level) for level in levels) for levels in shown[by].itertuples(index=False)]
+    fig = go.Figure(go.Scatter(
+        x=shown["mean"],
+        y=labels,
+        mode="markers",
+        marker=dict(color=color, size=8),
+        error_x=dict(
+            type="data",
+            symmetric=False,
+            array=(shown["ci_high"] - shown["mean"]).fillna(0),
+            arrayminus=(shown["mean"] - shown["ci_low"]).fillna(0),
+        ),
+        customdata=shown["n"],
+        hovertemplate="%{y}<br>mean %{x:.2f} (n = %{customdata})<extra></extra>",
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis=dict(autorange="reversed", automargin=True),
+        height=max(400, 24 * len(shown) + 150),
+    )
+    return fig
@@ -0,0 +1,606 @@
+"""Count/sum cube over the categorical survey dimensions.
+
+A ``Cube`` holds 1-D and 2-D count tables (and sums of numeric measures) over
+the ordinal codes of the survey questions. Each table is built with a single
+``np.bincount`` pass the first time it is asked for and then reused, so every
+crosstab, normalised proportion or grouped mean the pages draw is answered by
+slicing a tiny array instead of scanning the rows again.
+
+Correlation matrices between ordinal questions (Pearson of the codes,
+Spearman, Kendall's tau-b or polychoric) are computed for every pair at once
+from the stacked 2-D count tables and memoised on the cube, so each filter
+state pays for them once.
+
+Cubes are also mergeable: ``precompute()`` builds every 1-D/2-D table,
+``tables_only()`` drops the row data, and ``+=`` adds the tables of another
+cube. Chunked ingestion uses this to fold a CSV of any size into one cube
+whose memory depends only on the number of answer levels.
+
+``group_stats(dim, by)`` drills down into any combination of dimensions: one
+table over ``by`` plus ``dim`` gives every group's histogram of answers, and
+with it the count, mean and confidence interval of ``dim``'s score.
+
+``facets(dim)`` splits a cube by the levels of one dimension (e.g. the survey
+wave) into per-level cubes that slice the parent's tables over ``dim`` plus
+the queried dimensions, so every query compares all levels in one pass.
+
+Stored tables and correlation matrices are read-only arrays: one cube per
+filter state is shared by every session in the process.
+"""
+import itertools
+import threading
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+CORRELATION_METHODS = ("pearson", "spearman", "kendall", "polychoric")
+
+
+class Cube:
+    """Lazily built count/sum tables over the coded survey columns.
+
+    ``df`` must carry the categorical question columns from ``schema``;
+    ``measures`` are numeric columns (e.g. ``performance_numeric``) whose sums
+    are tracked alongside the counts (a measure named ``<question>_numeric``
+    is that question's schema score, so its totals and 1-D sums are read off
+    the count tables). An optional boolean ``mask`` restricts the cube to a
+    subset of rows.
+    """
+
+    def __init__(self, df, measures=(), dims=None, mask=None):
+        # NOTE: keep in sync with from_tables(), which bypasses __init__
+        self.dims = list(dims or schema.QUESTIONS)
+        self.measures = list(measures)
+        self._levels = {dim: list(df[dim].cat.categories) for dim in self.dims}
+        # .array.codes is a view of the column (no copy, even for memory-mapped data)
+        self._codes = {dim: df[dim].array.codes for dim in self.dims}
+        self._values = {m: df[m].to_numpy(dtype="float64") for m in self.measures}
+        self._mask = None if mask is None else np.asarray(mask, dtype=bool)
+        self.n_rows = len(df) if mask is None else int(self._mask.sum())
+        # masked columns, compressed on first use so each table scans n_rows only
+        self._columns = {}
+        self._tables = {}
+        self._correlations = {}
+        self._facets = {}
+        self._lock = threading.Lock()
+
+    # --- Table construction ---
+    def _table(self, dims, measure=None):
+        """Counts over ``dims``, or ``(sums, counts)`` of ``measure``.
+
+        Rows with a missing answer in any of ``dims`` (or a missing measure)
+        are left out, as ``pd.crosstab`` and ``pivot_table`` do.
+        """
+        key = (tuple(dims), measure)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+        if len(dims) == 2:
+            transposed = self._tables.get((tuple(dims[::-1]), measure))
+            if transposed is not None:
+                return _transpose(transposed)
+        alias = self._scored(dims, measure)
+        if alias is not None:
+            # a question's score is a function of its answer: sum the count table
+            counts = self._table([*dims, alias])
+            table = (counts @ schema.score_table(alias), counts.sum(axis=-1))
+            with self._lock:
+                table = self._tables[key] = _readonly(table)
+            return table
+        if self._codes is None:
+            raise KeyError(f"Table {key} was not precomputed and this cube holds no rows")
+
+        shape = tuple(len(self._levels[dim]) for dim in dims)
+        flat = np.zeros(self.n_rows, dtype=np.intp)
+        missing = None
+        for dim, size in zip(dims, shape):
+            codes = self._column(self._codes, dim)
+            flat = flat * size + codes
+            missing = _or_missing(missing, codes < 0)
+        weights = None
+        if measure is not None:
+            weights = self._column(self._values, measure)
+            missing = _or_missing(missing, np.isnan(weights))
+        if missing is not None:
+            flat = flat[~missing]
+            weights = None if weights is None else weights[~missing]
+
+        size = int(np.prod(shape))
+        table = np.bincount(flat, minlength=size).reshape(shape)
+        if measure is not None:
+            table = (np.bincount(flat, weights=weights, minlength=size).reshape(shape), table)
+
+        with self._lock:
+            table = self._tables[key] = _readonly(table)
+        return table
+
+    def _scored(self, dims, measure):
+        """Question whose score ``measure`` is, when its sums over ``dims`` follow from counts."""
+        alias = None if measure is None else measure.removesuffix("_numeric")
+        if len(dims) < 2 and alias in self._levels and alias not in dims:
+            return alias
+        return None
+
+    def _column(self, source, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = source[name] if self._mask is None else source[name][self._mask]
+            self._columns[name] = column
+        return column
+
+    def _frame(self, table, dims):
+        index = pd.Index(self._levels[dims[0]], name=dims[0])
+        if len(dims) == 1:
+            return pd.Series(table, index=index)
+        columns = pd.Index(self._levels[dims[1]], name=dims[1])
+        return pd.DataFrame(table, index=index, columns=columns)
+
+    # --- Precomputation and merging ---
+    def table_keys(self, sums=None):
+        """Keys of every 1-D and 2-D count table, plus measure-sum tables.
+
+        ``sums`` lists the ``(dims, measure)`` sums to include (default: every
+        0-D, 1-D and 2-D sum). Sums of a question's score over zero or one
+        dimension are left out: they follow from the count tables.
+        """
+        groups = [()] + [(dim,) for dim in self.dims] + list(itertools.combinations(self.dims, 2))
+        keys = [(dims, None) for dims in groups if dims]
+        if sums is None:
+            sums = [(dims, measure) for dims in groups for measure in self.measures]
+        return keys + [(tuple(dims), measure) for dims, measure in sums if self._scored(dims, measure) is None]
+
+    def precompute(self, sums=None):
+        """Build every table in ``table_keys(sums)`` now and return the cube."""
+        for dims, measure in self.table_keys(sums):
+            self._table(list(dims), measure)
+        return self
+
+    def tables_only(self):
+        """Cube sharing the built (read-only) tables and correlations, without the row data."""
+        cube = Cube.from_tables(self._levels, self._tables, self.n_rows, self.measures)
+        cube._correlations = dict(self._correlations)
+        return cube
+
+    def adopt(self, other):
+        """Take over tables and correlations built by ``other`` over the same rows.
+
+        Used to install results computed in another process; anything this
+        cube has already built is kept.
+        """
+        if self._levels != other._levels or self.n_rows != other.n_rows:
+            raise ValueError("Cannot adopt tables of a cube over different rows")
+        with self._lock:
+            tables = {key: _readonly(table) for key, table in other._tables.items()}
+            correlations = {key: _readonly(matrix) for key, matrix in other._correlations.items()}
+            self._tables = {**tables, **self._tables}
+            self._correlations = {**correlations, **self._correlations}
+        return self
+
+    @classmethod
+    def from_tables(cls, levels, tables, n_rows, measures=()):
+        """Cube answering queries from precomputed ``tables`` only."""
+        cube = cls.__new__(cls)
+        cube.dims = list(levels)
+        cube.measures = list(measures)
+        cube._levels = dict(levels)
+        cube._codes = cube._values = cube._mask = None
+        cube.n_rows = n_rows
+        cube._columns = {}
+        cube._tables = {key: _readonly(table) for key, table in tables.items()}
+        cube._correlations = {}
+        cube._facets = {}
+        cube._lock = threading.Lock()
+        return cube
+
+    def __iadd__(self, other):
+        """Add the tables of ``other`` (a disjoint set of rows) into this cube.
+
+        Only tables present in both cubes survive, so the result never
+        silently mixes complete and partial counts.
+        """
+        if self._levels != other._levels:
+            raise ValueError("Cannot merge cubes built on different answer levels")
+        with self._lock:
+            self._tables = {
+                key: _readonly(_add(table, other._table(list(key[0]), key[1])))
+                for key, table in self._tables.items()
+                if _has_table(other, key)
+            }
+            self._correlations = {}
+            self._facets = {}
+            self.n_rows += other.n_rows
+        return self
+
+    # --- Facets ---
+    def facets(self, dim):
+        """One cube per level of ``dim`` that has rows, keyed by level.
+
+        Facets hold no rows: every table a facet is asked for is sliced out
+        of one table of this cube over ``dim`` plus the facet's dimensions,
+        so comparing all levels costs a single ``np.bincount`` pass over the
+        combined keys instead of one pass per level.
+        """
+        facets = self._facets.get(dim)
+        if facets is None:
+            counts = self._table([dim])
+            levels = {other: self._levels[other] for other in self.dims if other != dim}
+            facets = {
+                level: _Facet.of(self, dim, code, levels)
+                for code, level in enumerate(self._levels[dim])
+                if counts[code]
+            }
+            with self._lock:
+                self._facets[dim] = facets
+        return facets
+
+    # --- Queries ---
+    def counts(self, index, columns=None):
+        """Row counts by one or two dimensions (Series or DataFrame)."""
+        dims = [index] if columns is None else [index, columns]
+        return self._frame(self._table(dims), dims)
+
+    def crosstab(self, index, columns, normalize=False):
+        """Equivalent of ``pd.crosstab(df[index], df[columns], normalize=...)``.
+
+        Levels that never occur are kept as zero rows/columns so charts keep
+        a stable shape; ``normalize`` accepts ``"index"``, ``"columns"``,
+        ``"all"``/``True`` or ``False``.
+        """
+        table = self._table([index, columns]).astype("float64")
+        if normalize == "index":
+            table = _divide(table, table.sum(axis=1, keepdims=True))
+        elif normalize == "columns":
+            table = _divide(table, table.sum(axis=0, keepdims=True))
+        elif normalize is True or normalize == "all":
+            table = _divide(table, table.sum())
+        return self._frame(table, [index, columns])
+
+    def mean(self, measure, index=None, columns=None):
+        """Mean of ``measure`` by zero, one or two dimensions (NaN when empty)."""
+        dims = [dim for dim in (index, columns) if dim is not None]
+        sums, counts = self._table(dims, measure)
+        if not dims:
+            return float(_divide(sums, counts))
+        return self._frame(_divide(sums, counts), dims)
+
+    def mode(self, dim):
+        """Most common level of ``dim`` (None when there are no answers)."""
+        table = self._table([dim])
+        if not table.any():
+            return None
+        return self._levels[dim][int(table.argmax())]
+
+    def box_stats(self, dim, by):
+        """Box-plot statistics of ``dim``'s numeric score within each level of ``by``.
+
+        Quartiles use linear interpolation (as numpy and Plotly do) over the
+        per-group histogram of answers; whiskers reach the most extreme
+        answer within 1.5 IQR of the box. Returns one row per ``by`` level
+        with ``n``, ``mean``, ``q1``, ``median``, ``q3``, ``lowerfence`` and
+        ``upperfence``; empty groups are dropped.
+        """
+        counts = self._table([by, dim]).astype("float64")
+        values = schema.score_table(dim)
+        stats = _box_stats(counts, values)
+        frame = pd.DataFrame(stats, index=pd.Index(self._levels[by], name=by))
+        return frame[frame["n"] > 0]
+
+    def group_stats(self, dim, by, confidence=0.95):
+        """Count, mean and confidence interval of ``dim``'s numeric score per group of ``by``.
+
+        ``by`` is a list of dimensions. The table over ``[*by, dim]`` is one
+        ``np.bincount`` pass over the combined codes and holds each group's
+        histogram of answers, from which the moments follow exactly. Returns
+        one row per non-empty group (indexed by ``by``) with ``n``, ``mean``,
+        ``std`` and the normal-approximation ``ci_low``/``ci_high`` (NaN
+        for groups of one).
+        """
+        by = list(by)
+        counts = self._table([*by, dim]).astype("float64")
+        counts = counts.reshape(-1, counts.shape[-1])
+        values = schema.score_table(dim)
+        n = counts.sum(axis=1)
+        mean = _divide(counts @ values, n)
+        squares = (counts * (values[None, :] - np.nan_to_num(mean)[:, None]) ** 2).sum(axis=1)
+        std = np.sqrt(_divide(squares, n - 1))
+        half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * _divide(std, np.sqrt(n))
+        index = pd.MultiIndex.from_product([self._levels[d] for d in by], names=by)
+        frame = pd.DataFrame({
+            "n": n.astype(np.int64), "mean": mean, "std": std,
+            "ci_low": mean - half_width, "ci_high": mean + half_width,
+        }, index=index)
+        return frame[frame["n"] > 0]
+
+    def kde(self, dim, by, points=100):
+        """Gaussian KDE of ``dim``'s numeric score within each level of ``by``.
+
+        Densities are evaluated for every group at once from the per-group
+        histograms (answers are discrete levels), with Silverman's bandwidth
+        and a grid spanning two bandwidths past the data, as Plotly's violin
+        does. Returns ``{level: (grid, density)}`` for non-empty groups.
+        """
+        counts = self._table([by, dim]).astype("float64")
+        values = schema.score_table(dim)
+        grids, densities = _kde(counts, values, points)
+        return {
+            level: (grids[i], densities[i])
+            for i, level in enumerate(self._levels[by])
+            if counts[i].sum() > 0
+        }
+
+    def corr(self, dims, method="pearson"):
+        """Correlation matrix of the ordinal answers of ``dims`` (pairwise complete).
+
+        ``method`` is one of ``CORRELATION_METHODS``: Pearson of the ordinal
+        codes, Spearman (Pearson of mid-ranks), Kendall's tau-b, or the
+        polychoric correlation of the latent normal variables. Every pair is
+        computed in one batch from the stacked joint count tables, and the
+        matrix is memoised on the cube.
+        """
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Unknown correlation method {method!r}; expected one of {CORRELATION_METHODS}")
+        key = (tuple(dims), method)
+        matrix = self._correlations.get(key)
+        if matrix is None:
+            pairs = list(itertools.combinations(range(len(dims)), 2))
+            matrix = np.eye(len(dims))
+            if pairs:
+                tables = _stack([self._table([dims[i], dims[j]]) for i, j in pairs])
+                rows, cols = np.array(pairs).T
+                matrix[rows, cols] = matrix[cols, rows] = _CORRELATIONS[method](tables)
+            with self._lock:
+                self._correlations[key] = _readonly(matrix)
+        return pd.DataFrame(matrix, index=list(dims), columns=list(dims))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class _Facet(Cube):
+    """Rows of a parent cube with one level of a dimension, answered from its tables."""
+
+    @classmethod
+    def of(cls, parent, dim, code, levels):
+        facet = cls.from_tables(levels, {}, int(parent._table([dim])[code]), parent.measures)
+        facet._parent, facet._dim, facet._code = parent, dim, code
+        return facet
+
+    def _table(self, dims, measure=None):
+        key = (tuple(dims), measure)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._parent._table([self._dim, *dims], measure)
+            table = tuple(part[self._code] for part in table) if isinstance(table, tuple) else table[self._code]
+            with self._lock:
+                table = self._tables[key] = _readonly(table)
+        return table
+
+
+def _or_missing(missing, new):
+    """Accumulate a missing-row mask, staying None while nothing is missing."""
+    if not new.any():
+        return missing
+    return new if missing is None else missing | new
+
+
+def _has_table(cube, key):
+    dims, measure = key
+    if cube._codes is not None or key in cube._tables:
+        return True
+    return len(dims) == 2 and (dims[::-1], measure) in cube._tables
+
+
+def _transpose(table):
+    if isinstance(table, tuple):
+        return tuple(part.T for part in table)
+    return table.T
+
+
+def _readonly(table):
+    """The table with its array(s) marked read-only (0-d sums stay arrays)."""
+    if isinstance(table, tuple):
+        return tuple(_readonly(part) for part in table)
+    table = np.asarray(table)
+    table.flags.writeable = False
+    return table
+
+
+def _add(left, right):
+    if isinstance(left, tuple):
+        return tuple(a + b for a, b in zip(left, right))
+    return left + right
+
+
+def _box_stats(counts, values):
+    """Vectorised quartiles/whiskers for each row of a (groups x levels) histogram."""
+    n = counts.sum(axis=1)
+    cumulative = counts.cumsum(axis=1)
+
+    def order_statistic(rank):
+        # value of the rank-th (0-based) sorted observation in every group
+        index = (cumulative <= rank[:, None]).sum(axis=1)
+        return values[np.minimum(index, len(values) - 1)]
+
+    def quantile(q):
+        position = q * np.maximum(n - 1, 0)
+        low = np.floor(position)
+        frac = position - low
+        return order_statistic(low) * (1 - frac) + order_statistic(np.ceil(position)) * frac
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    present = counts > 0
+    inside_low = present & (values[None, :] >= (q1 - 1.5 * iqr)[:, None])
+    inside_high = present & (values[None, :] <= (q3 + 1.5 * iqr)[:, None])
+    lowerfence = np.where(inside_low, values[None, :], np.inf).min(axis=1)
+    upperfence = np.where(inside_high, values[None, :], -np.inf).max(axis=1)
+    mean = _divide((counts * values[None, :]).sum(axis=1), n)
+    return {
+        "n": n.astype(np.int64), "mean": mean, "q1": q1, "median": median, "q3": q3,
+        "lowerfence": lowerfence, "upperfence": upperfence,
+    }
+
+
+def _kde(counts, values, points):
+    """Per-group Gaussian KDE on a (groups x points) grid from histograms."""
+    stats = _box_stats(counts, values)
+    n = np.maximum(counts.sum(axis=1), 1)
+    mean = stats["mean"]
+    std = np.sqrt(_divide((counts * (values[None, :] - mean[:, None]) ** 2).sum(axis=1), n))
+    spread = np.minimum(std, (stats["q3"] - stats["q1"]) / 1.349)
+    # fall back to the standard deviation, then to the level spacing, for degenerate groups
+    spread = np.where(spread > 0, spread, std)
+    spacing = np.diff(values).min() if len(values) > 1 else 1.0
+    bandwidth = np.where(spread > 0, 1.059 * spread * n ** -0.2, 0.25 * spacing)
+    bandwidth = np.nan_to_num(bandwidth, nan=0.25 * spacing)
+
+    present = counts > 0
+    low = np.where(present, values[None, :], np.inf).min(axis=1) - 2 * bandwidth
+    high = np.where(present, values[None, :], -np.inf).max(axis=1) + 2 * bandwidth
+    low, high = np.nan_to_num(low, posinf=0.0), np.nan_to_num(high, neginf=0.0)
+    grids = low[:, None] + (high - low)[:, None] * np.linspace(0, 1, points)[None, :]
+
+    # (groups, points, levels) kernel weights, summed over levels
+    z = (grids[:, :, None] - values[None, None, :]) / bandwidth[:, None, None]
+    kernel = np.exp(-0.5 * z**2) / np.sqrt(2 * np.pi)
+    densities = (kernel * counts[:, None, :]).sum(axis=2) / (n * bandwidth)[:, None]
+    return grids, densities
+
+
+# --- Batched correlations over stacked (pairs x rows x columns) count tables ---
+def _stack(tables):
+    """Stack 2-D count tables into one float array, zero-padded to a common shape."""
+    rows = max(table.shape[0] for table in tables)
+    cols = max(table.shape[1] for table in tables)
+    stacked = np.zeros((len(tables), rows, cols))
+    for k, table in enumerate(tables):
+        stacked[k, :table.shape[0], :table.shape[1]] = table
+    return stacked
+
+
+def _scored_pearson(tables, x, y):
+    """Pearson correlation per table, scoring rows by ``x`` and columns by ``y``."""
+    n = tables.sum(axis=(1, 2))
+    px = _divide(tables.sum(axis=2), n[:, None])
+    py = _divide(tables.sum(axis=1), n[:, None])
+    dx = x - (px * x).sum(axis=1, keepdims=True)
+    dy = y - (py * y).sum(axis=1, keepdims=True)
+    cov = _divide(np.einsum("pi,pij,pj->p", dx, tables, dy), n)
+    sx = np.sqrt((px * dx**2).sum(axis=1))
+    sy = np.sqrt((py * dy**2).sum(axis=1))
+    return _divide(cov, sx * sy)
+
+
+def _pearson(tables):
+    """Pearson correlation of the row/column ordinal codes."""
+    _, rows, cols = tables.shape
+    x = np.broadcast_to(np.arange(rows, dtype="float64"), tables.shape[:2])
+    y = np.broadcast_to(np.arange(cols, dtype="float64"), (len(tables), cols))
+    return _scored_pearson(tables, x, y)
+
+
+def _midranks(margins):
+    """Average 1-based rank of the answers at each level, from level counts."""
+    return np.cumsum(margins, axis=1) - (margins - 1) / 2
+
+
+def _spearman(tables):
+    """Spearman correlation: Pearson of the tied (mid-)ranks."""
+    return _scored_pearson(tables, _midranks(tables.sum(axis=2)), _midranks(tables.sum(axis=1)))
+
+
+def _kendall(tables):
+    """Kendall's tau-b, counting concordant/discordant pairs with cumulative sums."""
+    # responses in a strictly higher row, same column
+    below = np.cumsum(tables[:, ::-1], axis=1)[:, ::-1] - tables
+    # ... and a strictly higher / lower column
+    concordant = np.cumsum(below[:, :, ::-1], axis=2)[:, :, ::-1] - below
+    discordant = np.cumsum(below, axis=2) - below
+    score = (tables * (concordant - discordant)).sum(axis=(1, 2))
+
+    n = tables.sum(axis=(1, 2))
+    pairs = n * (n - 1) / 2
+    rows, cols = tables.sum(axis=2), tables.sum(axis=1)
+    tied_rows = (rows * (rows - 1) / 2).sum(axis=1)
+    tied_cols = (cols * (cols - 1) / 2).sum(axis=1)
+    return _divide(score, np.sqrt((pairs - tied_rows) * (pairs - tied_cols)))
+
+
+# Gauss-Legendre nodes/weights on [0, 1] for the bivariate normal integral
+_NODES, _WEIGHTS = np.polynomial.legendre.leggauss(20)
+_NODES, _WEIGHTS = (_NODES + 1) / 2, _WEIGHTS / 2
+# Thresholds are clipped here; the normal tails beyond carry no mass in float64
+_BOUND = 8.0
+_normal_cdf = np.vectorize(NormalDist().cdf, otypes=["float64"])
+_normal_quantile = np.vectorize(NormalDist().inv_cdf, otypes=["float64"])
+
+
+def _thresholds(margins):
+    """Latent normal cut points (pairs x levels+1) from the answer counts per level."""
+    cumulative = _divide(np.cumsum(margins, axis=1), margins.sum(axis=1, keepdims=True))
+    cumulative = np.nan_to_num(cumulative)
+    inner = _normal_quantile(np.clip(cumulative, 1e-12, 1 - 1e-12))
+    inner = np.where(cumulative <= 0, -_BOUND, np.where(cumulative >= 1, _BOUND, inner))
+    edges = np.concatenate([np.full((len(margins), 1), -_BOUND), inner], axis=1)
+    return np.clip(edges, -_BOUND, _BOUND)
+
+
+def _bivariate_cdf(h, k, rho):
+    """Standard bivariate normal CDF on threshold grids, for several ``rho`` per pair.
+
+    ``h`` is (pairs, a), ``k`` is (pairs, b) and ``rho`` is (pairs, g); the
+    result is (pairs, g, a, b). Uses Plackett's identity, integrating the
+    density over the correlation from 0 to ``rho`` with Gauss-Legendre.
+    """
+    h, k = h[:, None, :, None], k[:, None, None, :]
+    independent = _normal_cdf(h) * _normal_cdf(k)
+    integral = np.zeros(np.broadcast_shapes(independent.shape, rho.shape + (1, 1)))
+    for node, weight in zip(_NODES, _WEIGHTS):
+        r = (rho * node)[:, :, None, None]
+        scale = 1 - r**2
+        density = np.exp(-(h**2 - 2 * r * h * k + k**2) / (2 * scale)) / (2 * np.pi * np.sqrt(scale))
+        integral += weight * density
+    return independent + rho[:, :, None, None] * integral
+
+
+def _polychoric(tables):
+    """Polychoric correlation: maximum-likelihood latent normal correlation.
+
+    Thresholds come from the marginal proportions (the usual two-step
+    estimator); ``rho`` is then found for all pairs at once by a coarse grid
+    search over the log-likelihood, refined twice on finer grids around the
+    best point (accurate to about 0.001).
+    """
+    h, k = _thresholds(tables.sum(axis=2)), _thresholds(tables.sum(axis=1))
+    best = np.zeros(len(tables))
+    for step, half_width in ((0.05, 19), (0.002, 15), (0.0002, 6)):
+        grid = np.clip(best[:, None] + step * np.arange(-half_width, half_width + 1), -0.999, 0.999)
+        cells = np.diff(np.diff(_bivariate_cdf(h, k, grid), axis=2), axis=3)
+        loglik = (tables[:, None] * np.log(np.maximum(cells, 1e-300))).sum(axis=(2, 3))
+        best = grid[np.arange(len(tables)), loglik.argmax(axis=1)]
+    # undefined when either question has fewer than two answered levels
+    defined = ((tables.sum(axis=2) > 0).sum(axis=1) > 1) & ((tables.sum(axis=1) > 0).sum(axis=1) > 1)
+    return np.where(defined, best, np.nan)
+
+
+_CORRELATIONS = {
+    "pearson": _pearson,
+    "spearman": _spearman,
+    "kendall": _kendall,
+    "polychoric": _polychoric,
+}
+
+
+def _divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype="float64")
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
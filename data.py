@@ -0,0 +1,698 @@
+"""Shared data layer for the dashboard pages.
+
+The survey CSV ships with the repository, so it is read from disk first and the
+GitHub copy is only used when the local file is missing. One parsed frame is
+kept per process and is reloaded only when the file on disk actually changes.
+It is shared by every session without copying, so the frames, masks and cube
+tables handed out are backed by read-only arrays: an in-place write raises
+instead of changing the data under every other session.
+
+Exports larger than ``STREAM_THRESHOLD`` bytes are never loaded whole: they
+are read in ``CHUNK_SIZE``-row batches and folded into a table-only ``Cube``
+(streaming mode), so memory stays bounded by the number of answer levels.
+The folded tables are saved next to the CSV under its content hash, so later
+processes load them in milliseconds instead of re-reading the export.
+
+The typed frame of a parsed CSV is also written next to it as an Arrow IPC
+file named after the CSV's content hash. Later processes memory-map that file
+instead of parsing text, and the category codes point straight into the
+mapped pages, so every worker on the machine shares one copy of the data.
+
+Survey exports grow by appending rows. Each load remembers how many bytes it
+parsed and their hash; when the file later grows and those bytes are
+unchanged, only the new lines are parsed and folded into the cached frame, the aggregate tables
+and every cached filtered view (append mode), so a refresh costs the delta
+rather than the whole history.
+
+When survey waves are registered (see ``waves``), they replace the default
+dataset: each wave's CSV is parsed (or memory-mapped) into the same
+categorical dictionary and the waves are stored back to back in one frame
+with a ``wave`` category column, one contiguous partition per wave. Cubes
+then carry ``wave`` as a dimension, so any chart can be split by wave with
+``Cube.facets``.
+
+By default every read checks the source and reloads it in place when it
+changed. While a refresh scheduler runs (see ``refresh``), reads serve the
+published version as it is; the scheduler builds the next version privately
+with ``staged_reload`` and swaps it in once it is warm.
+"""
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # the columnar cache is an optimisation only
+    pa = None
+
+import profiling
+import schema
+import waves
+from cube import Cube
+from sketch import MetricSketch
+from filters import BitmapIndex, selection_key
+
+# --- Data source (SURVEY_DATA_FILE points the app at another export) ---
+DATA_FILE = os.environ.get("SURVEY_DATA_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "Student Insomnia and Educational Outcomes Dataset.csv",
+)
+DATA_URL = "https://raw.githubusercontent.com/aleya566/assignment/refs/heads/main/Student%20Insomnia%20and%20Educational%20Outcomes%20Dataset.csv"
+
+# --- Process-wide cache ---
+# Maps a source (file path or URL) to {"signature", "hash", "df"}; files also
+# keep the running digest and byte offset of what was parsed, for append mode.
+_cache = {}
+_lock = threading.Lock()
+# While a scheduler owns reloading, reads never look at the source; the next
+# version is staged on the scheduler's thread only
+_scheduled = False
+_staging = threading.local()
+
+# Filtered views (mask + cube) kept per dataset version, least recently used first
+MAX_VIEWS = 32
+
+# --- Chunked ingestion ---
+STREAM_THRESHOLD = int(os.environ.get("SURVEY_STREAM_THRESHOLD", 256 * 2**20))
+CHUNK_SIZE = int(os.environ.get("SURVEY_CHUNK_SIZE", 100_000))
+HEAD_ROWS = 5
+
+# --- Columnar and aggregate caches (set SURVEY_COLUMNAR_CACHE=0 to disable) ---
+COLUMNAR_CACHE = os.environ.get("SURVEY_COLUMNAR_CACHE", "1") != "0"
+
+# --- Append mode ---
+# Bytes kept from the end of the parsed region to check it was not rewritten
+APPEND_CHECK_BYTES = 4096
+
+
+def file_signature(path):
+    """Cheap change check for a file: (mtime in ns, size in bytes)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of the file contents, read in chunks."""
+    return _digest(path, chunk_size)[0].hexdigest()
+
+
+def _digest(path, chunk_size=1 << 20, limit=None):
+    """Running SHA-256 of a file (or its first ``limit`` bytes) and the number of bytes it covers."""
+    digest, size = hashlib.sha256(), 0
+    with open(path, "rb") as f:
+        while limit is None or size < limit:
+            chunk = f.read(chunk_size if limit is None else min(chunk_size, limit - size))
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest, size
+
+
+# --- Derived columns built once by the preparation stage ---
+# Each alias gets an "<alias>_numeric" column holding its schema score.
+DERIVED = ["sleep_hours", "device_use", "performance", "concentration", "fatigue"]
+MEASURES = [f"{alias}_numeric" for alias in DERIVED]
+# Measure sums the pages read beyond what the count tables answer; streaming
+# mode builds only these (see ``Cube.table_keys``)
+SUMS = [(("concentration", "fatigue"), "performance_numeric")]
+
+
+def _load_file(path, entry):
+    signature = file_signature(path)
+    if entry is not None and entry["signature"] == signature:
+        return entry
+
+    # the file grew: parse only the new rows if the old ones are untouched
+    if entry is not None and signature[1] > entry["offset"] and _append(entry, path, signature):
+        return entry
+
+    # mtime/size moved: only re-parse if the contents really changed
+    digest, offset = _digest(path)
+    content_hash = digest.hexdigest()
+    if entry is not None and entry["hash"] == content_hash:
+        entry["signature"] = signature
+        return entry
+
+    if signature[1] > STREAM_THRESHOLD:
+        with profiling.span("load.stream"):
+            cube, head = _read_aggregates(path, content_hash)
+        entry = {"signature": signature, "hash": content_hash, "streaming": True, "head": head}
+        entry["views"] = OrderedDict({(): {"mask": None, "cube": cube}})
+    else:
+        with profiling.span("load.read"):
+            df = _read_columnar(path, content_hash)
+        entry = {"signature": signature, "hash": content_hash, "df": frozen(df)}
+    entry.update(digest=digest, offset=offset, check=_read_range(path, offset - APPEND_CHECK_BYTES, offset))
+    return entry
+
+
+def _read_range(path, start, end=None):
+    """Bytes ``[start, end)`` of a file (``end=None`` reads to the end)."""
+    start = max(start, 0)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read() if end is None else f.read(end - start)
+
+
+def _append(entry, path, signature):
+    """Fold the lines added after ``entry["offset"]`` into ``entry``.
+
+    Returns False (the caller then reloads the file) unless the parsed
+    region ends with a complete line and still has the same bytes, i.e. the
+    file was only appended to. Its tail is compared first, then its hash
+    (reading is far cheaper than parsing). A partly written last line is
+    left for the next refresh.
+    """
+    offset, check = entry["offset"], entry["check"]
+    if not check.endswith(b"\n") or _read_range(path, offset - len(check), offset) != check:
+        return False
+    if _digest(path, limit=offset)[0].hexdigest() != entry["hash"]:
+        return False
+    added = _read_range(path, offset)
+    added = added[: added.rfind(b"\n") + 1]
+    entry["signature"] = signature
+    if not added:
+        return True
+
+    with profiling.span("load.append"):
+        names = list(schema.QUESTIONS.values())
+        if entry.get("streaming"):
+            rows, _ = stream_aggregates(io.BytesIO(added), header=None, names=names)
+            view = entry["views"][()]
+            total = view["cube"].tables_only()
+            total += rows
+            view["cube"] = total
+            view.pop("sketch", None)
+        else:
+            rows = schema.read_csv(io.BytesIO(added), header=None, names=names)
+            entry["df"] = frozen(pd.concat([entry["df"], rows], ignore_index=True))
+            if "prepared" in entry:
+                _append_views(entry, prepare(rows))
+
+    digest = entry["digest"].copy()
+    digest.update(added)
+    offset += len(added)
+    entry.update(
+        hash=digest.hexdigest(), digest=digest, offset=offset,
+        check=(check + added)[-APPEND_CHECK_BYTES:],
+    )
+    try:
+        if entry.get("streaming") and COLUMNAR_CACHE:
+            _write_aggregates(entry["views"][()]["cube"], aggregates_path(path, entry["hash"]))
+        elif not entry.get("streaming") and pa is not None and COLUMNAR_CACHE:
+            _write_arrow(entry["df"], columnar_path(path, entry["hash"]))
+    except OSError:
+        pass  # read-only checkout; the CSV stays the source of truth
+    return True
+
+
+def _append_views(entry, rows):
+    """Extend the prepared frame and every cached view with prepared ``rows``.
+
+    Each view's tables are updated by adding the tables of its matching new
+    rows, so counts, sums and modes never rescan the existing rows. The
+    bitmap index is rebuilt on the next new selection.
+    """
+    prepared = entry["prepared"] = frozen(pd.concat([entry["prepared"], rows], ignore_index=True))
+    entry.pop("index", None)
+    index = BitmapIndex(rows)
+    for key, view in entry.get("views", {}).items():
+        added_mask = index.mask(key)
+        total = view["cube"].tables_only()
+        total += Cube(rows, measures=MEASURES, dims=_dims(rows), mask=added_mask)
+        if view["mask"] is None:
+            mask = None
+        else:
+            if added_mask is None:
+                added_mask = np.ones(len(rows), dtype=bool)
+            mask = np.concatenate([view["mask"], added_mask])
+        view["mask"] = _readonly(mask)
+        view["cube"] = Cube(prepared, measures=MEASURES, dims=_dims(prepared), mask=mask).adopt(total)
+        view.pop("sketch", None)
+
+
+def columnar_path(path, content_hash):
+    """Location of the Arrow cache for a CSV with the given content hash."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{content_hash[:16]}.arrow")
+
+
+def _read_columnar(path, content_hash):
+    """Typed frame for ``path``, from its Arrow cache when one exists."""
+    if pa is None or not COLUMNAR_CACHE:
+        return schema.read_csv(path)
+
+    cached = columnar_path(path, content_hash)
+    if os.path.exists(cached):
+        try:
+            return _map_arrow(cached)
+        except (OSError, pa.ArrowInvalid):
+            pass  # truncated or foreign file: rebuild it below
+
+    df = schema.read_csv(path)
+    try:
+        _write_arrow(df, cached)
+    except OSError:
+        pass  # read-only checkout; the CSV stays the source of truth
+    return df
+
+
+def _map_arrow(cached):
+    """Memory-map an Arrow cache file and wrap it without copying the codes."""
+    table = pa.ipc.open_file(pa.memory_map(cached, "r")).read_all()
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        dtype = schema.DTYPES.get(name)
+        if (
+            dtype is not None
+            and column.num_chunks == 1
+            and column.null_count == 0
+            and column.chunk(0).dictionary.to_pylist() == list(dtype.categories)
+        ):
+            # int8 indices viewed in place: read-only and shared between processes
+            codes = column.chunk(0).indices.to_numpy(zero_copy_only=True)
+            columns[name] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+        else:
+            columns[name] = column.to_pandas()
+    return pd.DataFrame(columns, copy=False)
+
+
+def _write_arrow(df, cached):
+    """Write ``df`` as a single-batch Arrow file, atomically, and drop stale caches."""
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+
+    def write(sink):
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _replace_cache(cached, ".arrow", write)
+
+
+def _replace_cache(cached, suffix, write):
+    """Create ``cached`` atomically with ``write(file)``; remove other versions of it."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cached), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            write(sink)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, cached)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    stem = cached[: -len(suffix)].rsplit(".", 1)[0]
+    for stale in glob.glob(glob.escape(stem) + ".*" + suffix):
+        if stale != cached:
+            os.unlink(stale)
+
+
+def aggregates_path(path, content_hash):
+    """Location of the folded tables (streaming mode) for a CSV with the given content hash."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{content_hash[:16]}.cube.npz")
+
+
+def _read_aggregates(path, content_hash):
+    """Table-only cube and head rows of a large CSV, from its aggregate cache when one exists."""
+    if not COLUMNAR_CACHE:
+        return stream_aggregates(path)
+
+    cached = aggregates_path(path, content_hash)
+    if os.path.exists(cached):
+        try:
+            cube = _load_aggregates(cached)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            cube = None  # truncated, foreign or outdated file: rebuild it below
+        if cube is not None:
+            return cube, frozen(prepare(schema.read_csv(path, nrows=HEAD_ROWS)))
+
+    cube, head = stream_aggregates(path)
+    try:
+        _write_aggregates(cube, cached)
+    except OSError:
+        pass  # read-only checkout; the CSV stays the source of truth
+    return cube, head
+
+
+def _aggregates_meta(cube):
+    """What a saved cube must match to be reused: its answer levels, measures and sums."""
+    levels = {dim: [str(level) for level in levels] for dim, levels in cube._levels.items()}
+    sums = [[list(dims), measure] for dims, measure in SUMS]
+    return {"levels": levels, "measures": list(cube.measures), "sums": sums}
+
+
+def _write_aggregates(cube, cached):
+    """Save the tables of a table-only cube as one ``.npz`` file, atomically."""
+    arrays = {}
+    for i, ((_, measure), table) in enumerate(cube._tables.items()):
+        if measure is None:
+            arrays[f"counts{i}"] = table
+        else:
+            arrays[f"sums{i}"], arrays[f"counts{i}"] = table
+    meta = {
+        **_aggregates_meta(cube),
+        "n_rows": cube.n_rows,
+        "tables": [[list(dims), measure] for dims, measure in cube._tables],
+    }
+    _replace_cache(cached, ".cube.npz", lambda sink: np.savez(sink, meta=np.array(json.dumps(meta)), **arrays))
+
+
+def _load_aggregates(cached):
+    """Cube saved by ``_write_aggregates``, or None when it was built by other code."""
+    with np.load(cached, allow_pickle=False) as saved:
+        meta = json.loads(str(saved["meta"]))
+        tables = {}
+        for i, (dims, measure) in enumerate(meta["tables"]):
+            counts = saved[f"counts{i}"]
+            tables[(tuple(dims), measure)] = counts if measure is None else (saved[f"sums{i}"], counts)
+    levels = {dim: list(schema.LEVELS[dim]) for dim in schema.QUESTIONS}
+    cube = Cube.from_tables(levels, tables, meta["n_rows"], MEASURES)
+    if {key: meta[key] for key in ("levels", "measures", "sums")} != _aggregates_meta(cube):
+        return None
+    return cube
+
+
+def _load_url(url, entry):
+    if entry is None:
+        entry = {"signature": None, "hash": None, "df": frozen(schema.read_csv(url))}
+    return entry
+
+
+def _load_waves(registered, entry):
+    """Entry holding every registered wave in one frame with a ``wave`` column.
+
+    Reloaded when any wave's contents change (unchanged waves come back from
+    their columnar caches); ``entry["partitions"]`` maps each wave to its
+    ``(start, stop)`` rows.
+    """
+    signature = tuple(file_signature(path) for _, path in registered)
+    if entry is not None and entry["signature"] == signature:
+        return entry
+
+    hashes = [file_hash(path) for _, path in registered]
+    content_hash = hashlib.sha256(
+        json.dumps([[name, digest] for (name, _), digest in zip(registered, hashes)]).encode()
+    ).hexdigest()
+    if entry is not None and entry["hash"] == content_hash:
+        entry["signature"] = signature
+        return entry
+
+    with profiling.span("load.waves"):
+        frames = [_read_columnar(path, digest) for (_, path), digest in zip(registered, hashes)]
+        sizes = [len(frame) for frame in frames]
+        df = pd.concat(frames, ignore_index=True)
+        df[waves.COLUMN] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(frames)), sizes),
+            dtype=pd.CategoricalDtype([name for name, _ in registered], ordered=True),
+        )
+    bounds = np.cumsum([0, *sizes]).tolist()
+    entry = {
+        "signature": signature,
+        "hash": content_hash,
+        "df": frozen(df),
+        "partitions": {name: (bounds[i], bounds[i + 1]) for i, (name, _) in enumerate(registered)},
+    }
+    return entry
+
+
+def _source(path, url):
+    """Cache key of the data behind ``path``/``url`` and the function (re)loading it."""
+    # registered waves replace the default dataset
+    registered = waves.registered()
+    if registered and path == DATA_FILE:
+        return (waves.COLUMN, tuple(registered)), lambda entry: _load_waves(registered, entry)
+    if os.path.exists(path):
+        return path, lambda entry: _load_file(path, entry)
+    if url:
+        return url, lambda entry: _load_url(url, entry)
+    raise FileNotFoundError(f"Survey data not found at {path!r} and no fallback URL given")
+
+
+def _entry(path, url):
+    key, load = _source(path, url)
+    staged = getattr(_staging, "entries", {})
+    if key in staged:
+        return staged[key]
+    entry = _cache.get(key)
+    if entry is None or not _scheduled:
+        entry = _cache[key] = load(entry)
+    return entry
+
+
+def _successor(entry):
+    """Copy of ``entry`` a reload can update without changing ``entry`` (data is shared)."""
+    successor = dict(entry)
+    if "views" in entry:
+        successor["views"] = OrderedDict((key, dict(view)) for key, view in entry["views"].items())
+    return successor
+
+
+def set_scheduled(scheduled):
+    """Let reads serve the published data without checking the source (see ``refresh``)."""
+    global _scheduled
+    _scheduled = scheduled
+
+
+@contextmanager
+def staged_reload(path=DATA_FILE, url=DATA_URL):
+    """Build the next version of a source off the request path, then publish it.
+
+    Yields the new dataset version, or None when the source is unchanged.
+    Inside the block, data calls made on this thread read the new version
+    (to precompute its aggregates) while every other thread keeps reading
+    the published one; it replaces the published version in one step when
+    the block exits without an error. Only the very first load, when there
+    is nothing to serve yet, is published at once.
+    """
+    with _lock:
+        key, load = _source(path, url)
+        current = _cache.get(key)
+        if current is None:
+            entry = _cache[key] = load(None)
+        else:
+            # appends update the copy; the published entry stays as it is
+            candidate = _successor(current)
+    if current is None:
+        yield _version(entry)
+        return
+
+    with profiling.span("refresh.load"):
+        entry = load(candidate)
+        changed = entry["hash"] != current["hash"]
+        if changed and not entry.get("streaming"):
+            _prepared(entry)
+            if "index" not in entry:
+                entry["index"] = BitmapIndex(entry["prepared"])
+    if not changed:
+        current["signature"] = entry["signature"]
+        yield None
+        return
+    _staging.entries = {key: entry}
+    try:
+        yield _version(entry)
+    finally:
+        del _staging.entries
+    with _lock:
+        _cache[key] = entry
+
+
+def load_data(path=DATA_FILE, url=DATA_URL):
+    """Return the survey frame shared by every page in this process.
+
+    Columns are renamed to their ``schema`` aliases and typed as ordered
+    categoricals. The bundled CSV is preferred; ``url`` is only fetched when
+    ``path`` does not exist. The returned frame is shared, so callers must
+    not modify it.
+    """
+    with _lock:
+        return _entry(path, url)["df"]
+
+
+def stream_aggregates(source, chunksize=CHUNK_SIZE, sums=SUMS, **kwargs):
+    """Fold a survey CSV into a table-only ``Cube``, one chunk at a time.
+
+    Each batch is parsed into the categorical schema, prepared, and reduced
+    to every 1-D/2-D count table (mode counters, sleep-hours histograms,
+    crosstabs) plus the measure sums in ``sums`` before the next one is read.
+    Returns ``(cube, head)`` where ``head`` holds the first few prepared rows.
+    Extra keyword arguments are passed to ``pandas.read_csv``.
+    """
+    total = head = None
+    for chunk in schema.read_csv_chunks(source, chunksize, **kwargs):
+        chunk = prepare(chunk)
+        if head is None:
+            head = frozen(chunk.head(HEAD_ROWS))
+        part = Cube(chunk, measures=MEASURES).precompute(sums)
+        if total is None:
+            total = part.tables_only()
+        else:
+            total += part
+    if total is None:
+        raise ValueError(f"No survey rows found in {source!r}")
+    return total, head
+
+
+def prepare(df):
+    """Return ``df`` plus the ``<alias>_numeric`` columns listed in ``DERIVED``."""
+    return df.assign(**{f"{alias}_numeric": schema.scores(df, alias) for alias in DERIVED})
+
+
+def frozen(df):
+    """``df`` rebuilt over read-only views of its column arrays (no copy)."""
+    columns = {}
+    for name, column in df.items():
+        values = column.array
+        if isinstance(values, pd.Categorical):
+            # .codes is already a read-only view of the codes
+            columns[name] = pd.Categorical.from_codes(values.codes, dtype=values.dtype, validate=False)
+        else:
+            columns[name] = _readonly(column.to_numpy().view())
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _readonly(array):
+    if array is not None:
+        array.flags.writeable = False
+    return array
+
+
+def prepare_data(path=DATA_FILE, url=DATA_URL):
+    """Return the prepared frame, built once per dataset version.
+
+    The same object is handed to every caller (no per-rerun copy), so pages
+    must treat it as read-only and never add or overwrite columns.
+    """
+    with _lock:
+        return _prepared(_entry(path, url))
+
+
+def _prepared(entry):
+    if entry.get("streaming"):
+        raise ValueError("Survey data is too large to load whole; use load_cube() in streaming mode")
+    if "prepared" not in entry:
+        with profiling.span("load.prepare"):
+            entry["prepared"] = frozen(prepare(entry["df"]))
+    return entry["prepared"]
+
+
+def _dims(df):
+    """Cube dimensions of a frame: every question, plus the wave when there is one."""
+    return [*schema.QUESTIONS, *([waves.COLUMN] if waves.COLUMN in df else [])]
+
+
+def _view(entry, selection):
+    """Mask and cube for a filter selection, built once and kept in an LRU."""
+    views = entry.setdefault("views", OrderedDict())
+    # streaming mode only has the aggregates of all rows, so filters cannot apply
+    key = () if entry.get("streaming") else selection_key(selection)
+    view = views.get(key)
+    if view is None:
+        df = _prepared(entry)
+        with profiling.span("load.filter"):
+            if "index" not in entry:
+                entry["index"] = BitmapIndex(df)
+            mask = _readonly(entry["index"].mask(key))
+            view = views[key] = {"mask": mask, "cube": Cube(df, measures=MEASURES, dims=_dims(df), mask=mask)}
+        if len(views) > MAX_VIEWS:
+            views.popitem(last=False)
+    views.move_to_end(key)
+    return view
+
+
+def load_cube(selection=None, path=DATA_FILE, url=DATA_URL):
+    """Return the aggregate ``Cube`` for a filter selection (None = all rows).
+
+    Cubes are cached per dataset version and filter state, so a chart whose
+    inputs did not change is answered from tables that are already built.
+    """
+    with _lock:
+        return _view(_entry(path, url), selection)["cube"]
+
+
+def load_sketch(selection=None, path=DATA_FILE, url=DATA_URL):
+    """Return the ``MetricSketch`` behind the metric cards for a filter selection.
+
+    Read off the selection's cube once (O(answer levels)) and kept with it,
+    so every later read is constant time.
+    """
+    with _lock:
+        view = _view(_entry(path, url), selection)
+        sketch = view.get("sketch")
+    if sketch is None:
+        # built outside the lock: missing 1-D tables scan the view's rows
+        sketch = view["sketch"] = MetricSketch.of(view["cube"])
+    return sketch
+
+
+def adopt_cube(selection, cube, version, path=DATA_FILE, url=DATA_URL):
+    """Install tables precomputed elsewhere into the cube for ``selection``.
+
+    Ignored (returns False) when the dataset changed since ``version``, so
+    stale results from a background warm-up can never leak into a newer one.
+    """
+    with _lock:
+        entry = _entry(path, url)
+        if _version(entry) != version:
+            return False
+        _view(entry, selection)["cube"].adopt(cube)
+        return True
+
+
+def _version(entry):
+    # URL sources are never re-read, so the frame's identity is its version
+    return entry["hash"] or f"url:{id(entry['df'])}"
+
+
+def dataset_version(path=DATA_FILE, url=DATA_URL):
+    """Identifier of the loaded dataset version (the CSV's content hash)."""
+    with _lock:
+        return _version(_entry(path, url))
+
+
+def is_streaming(path=DATA_FILE, url=DATA_URL):
+    """True when the data was too large to load and only aggregates exist."""
+    with _lock:
+        return bool(_entry(path, url).get("streaming"))
+
+
+def load_rows(selection=None, path=DATA_FILE, url=DATA_URL):
+    """Prepared rows matching a filter selection, or None in streaming mode."""
+    with _lock:
+        entry = _entry(path, url)
+        if entry.get("streaming"):
+            return None
+        df = _prepared(entry)
+        mask = _view(entry, selection)["mask"]
+        return df if mask is None else df[mask]
+
+
+def load_head(selection=None, n=HEAD_ROWS, path=DATA_FILE, url=DATA_URL):
+    """First ``n`` prepared rows for the dataset preview (works in both modes).
+
+    Only those rows are copied, never the whole filtered frame.
+    """
+    with _lock:
+        entry = _entry(path, url)
+        if entry.get("streaming"):
+            return entry["head"].head(n)
+        df = _prepared(entry)
+        mask = _view(entry, selection)["mask"]
+    return df.head(n) if mask is None else df.iloc[np.flatnonzero(mask)[:n]]
+
+
+def clear_cache():
+    """Drop every cached frame (mainly for tests and manual refreshes)."""
+    with _lock:
+        _cache.clear()
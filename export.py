@@ -0,0 +1,313 @@
+"""Bulk export of the aggregate tables behind every chart and metric card.
+
+    python export.py --output-dir exports --format csv parquet
+    python export.py --filter year="First year" --filter gender=Female
+    python export.py --serve --port 8502
+
+Every dataset in ``analytics`` is exported as one flat table: metric cards
+as ``(metric, answer, value)`` rows, proportions in their long form,
+heatmap grids and correlation matrices as ``(row, column, value)`` rows,
+box statistics and histograms by group (``<chart>.stats``,
+``<chart>.counts``) and KDE curves as ``(group, x, density)`` points. The
+tables come from the same per-selection cubes the pages use (warmed in the
+background), so nothing is recomputed from the rows for a selection that
+was already viewed or precomputed.
+
+The command writes one file per table and format plus ``manifest.json``.
+``--serve`` answers ``GET /tables`` (index with ETags and URLs),
+``GET /tables.json`` (every table in one JSON document) and
+``GET /tables/<name>.<csv|json|parquet>``; sidebar filters are query
+parameters (``?year=First+year&gender=Female``). The ETag of a response is a
+hash of the dataset's content hash, the selection, the table and the format,
+so a poll with a matching ``If-None-Match`` is answered ``304 Not Modified``
+without touching the data. The table names are fixed, so the index never
+computes a table either.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import pandas as pd
+
+import analytics
+import data
+import filters
+import schema
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Axis and value names of the 2-D grids, which are exported in long form
+GRIDS = {
+    "behavior_correlation": ("question", "other_question", "correlation"),
+    "sleep_hours_by_device_use": ("sleep_hours", "device_use", "responses"),
+    "performance_heatmap": ("concentration", "fatigue", "mean_performance"),
+}
+# Charts returning several datasets, exported as one "<chart>.<part>" table each
+PARTS = {
+    "sleep_hours_by_gender": ("stats", "counts"),
+    "performance_by_sleep_impact": ("stats", "counts"),
+    "performance_by_concentration": ("stats", "counts", "kde"),
+}
+# Serialised tables kept per (ETag), least recently used first
+MAX_PAYLOADS = 256
+
+_payloads = OrderedDict()
+_lock = threading.Lock()
+
+
+# --- Tables ---
+def _metrics(values):
+    return pd.DataFrame({
+        "metric": list(values),
+        "answer": [value if isinstance(value, str) else None for value in values.values()],
+        "value": [None if isinstance(value, str) else value for value in values.values()],
+    })
+
+
+def _kde(curves, by):
+    frames = [pd.DataFrame({by: level, "x": x, "density": y}) for level, (x, y) in curves.items()]
+    if not frames:  # no group has answers (e.g. a selection matching no rows)
+        return pd.DataFrame({by: pd.Series(dtype=object), "x": pd.Series(dtype=float), "density": pd.Series(dtype=float)})
+    return pd.concat(frames, ignore_index=True)
+
+
+def _flatten(name, result):
+    """Flat tables (name -> DataFrame) of one analytics result."""
+    if name in GRIDS:
+        row, column, value = GRIDS[name]
+        grid = result.rename_axis(index=row, columns=column)
+        return {name: grid.stack().rename(value).reset_index()}
+    if isinstance(result, pd.DataFrame):
+        return {name: result}
+    tables = {}
+    for part, table in result.items():
+        if part == "kde":
+            tables[f"{name}.{part}"] = _kde(table, result["stats"].index.name)
+        else:
+            # parquet needs string column names
+            tables[f"{name}.{part}"] = table.rename(columns=str).reset_index()
+    return tables
+
+
+def tables(selection=None, names=None):
+    """Every metric and chart dataset for a selection as flat DataFrames.
+
+    ``names`` restricts the result to the given metric/chart names.
+    """
+    results = analytics.compute(selection, names)
+    exported = {name: _metrics(values) for name, values in results["metrics"].items()}
+    for name, result in results["charts"].items():
+        exported.update(_flatten(name, result))
+    return exported
+
+
+def table_names():
+    """Names of the exported tables (the same for every selection), without computing them."""
+    names = list(analytics.METRICS)
+    for name in analytics.CHARTS:
+        names += [f"{name}.{part}" for part in PARTS[name]] if name in PARTS else [name]
+    return names
+
+
+def serialize(frame, fmt):
+    """``frame`` encoded as ``fmt`` (one of ``FORMATS``)."""
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode()
+    if fmt == "json":
+        return frame.to_json(orient="records").encode()
+    if fmt == "parquet":
+        return frame.to_parquet(index=False)
+    raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(FORMATS)}")
+
+
+# --- Cached payloads ---
+def etag(name, fmt, selection=None):
+    """Cache validator of one exported table; changes only with its inputs."""
+    key = json.dumps([data.dataset_version(), filters.selection_key(selection), name, fmt])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def payload(name, fmt, selection=None):
+    """``(etag, bytes)`` of one table, serialised once per dataset version and selection."""
+    tag = etag(name, fmt, selection)
+    with _lock:
+        body = _payloads.get(tag)
+        if body is not None:
+            _payloads.move_to_end(tag)
+            return tag, body
+    frame = tables(selection, [name.split(".")[0]]).get(name)
+    if frame is None:
+        raise KeyError(name)
+    body = serialize(frame, fmt)
+    with _lock:
+        _payloads[tag] = body
+        if len(_payloads) > MAX_PAYLOADS:
+            _payloads.popitem(last=False)
+    return tag, body
+
+
+def write(output_dir, formats=("csv",), selection=None):
+    """Write every table in each format to ``output_dir`` plus a manifest; returns the manifest."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"dataset_version": data.dataset_version(), "selection": selection or {}, "tables": {}}
+    for name in table_names():
+        files = manifest["tables"][name] = {}
+        for fmt in formats:
+            tag, body = payload(name, fmt, selection)
+            filename = f"{name}.{fmt}"
+            with open(os.path.join(output_dir, filename), "wb") as f:
+                f.write(body)
+            files[fmt] = {"file": filename, "etag": tag, "bytes": len(body)}
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def parse_selection(pairs):
+    """Selection from ``(dimension, level)`` pairs; raises ValueError on unknown ones."""
+    selection = {}
+    for dim, level in pairs:
+        if dim not in filters.STATE_KEYS:
+            raise ValueError(f"Unknown filter {dim!r}; expected one of {list(filters.STATE_KEYS)}")
+        if level not in schema.LEVELS[dim]:
+            raise ValueError(f"Unknown {dim} level {level!r}")
+        selection.setdefault(dim, []).append(level)
+    return selection
+
+
+# --- HTTP endpoint ---
+class ExportHandler(BaseHTTPRequestHandler):
+    """Read-only endpoint over ``payload()``; see the module docstring."""
+
+    server_version = "SurveyExport/1.0"
+
+    def do_GET(self):
+        try:
+            self._get()
+        except Exception as error:  # answer instead of dropping the connection
+            self.log_error("Export failed for %s: %r", self.path, error)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"Export failed: {error}")
+
+    def _get(self):
+        url = urlsplit(self.path)
+        try:
+            selection = parse_selection(
+                (dim, level) for dim, levels in parse_qs(url.query).items() for level in levels
+            )
+        except ValueError as error:
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(error))
+
+        if url.path in ("/", "/tables"):
+            tag = etag("*", "index", selection)
+            if self._not_modified(tag):
+                return
+            return self._send(json.dumps(self._index(selection)).encode(), FORMATS["json"], tag)
+        if url.path == "/tables.json":
+            tag = etag("*", "json", selection)
+            if self._not_modified(tag):
+                return
+            body = {name: json.loads(payload(name, "json", selection)[1]) for name in table_names()}
+            return self._send(json.dumps(body).encode(), FORMATS["json"], tag)
+
+        name, _, fmt = url.path.removeprefix("/tables/").rpartition(".")
+        if not url.path.startswith("/tables/") or fmt not in FORMATS:
+            return self._send_error(HTTPStatus.NOT_FOUND, f"No such resource: {url.path}")
+        tag = etag(name, fmt, selection)
+        if self._not_modified(tag):
+            return
+        try:
+            tag, body = payload(name, fmt, selection)
+        except KeyError:
+            return self._send_error(HTTPStatus.NOT_FOUND, f"No such table: {name}")
+        self._send(body, FORMATS[fmt], tag)
+
+    def _index(self, selection):
+        query = urlencode([(dim, level) for dim, levels in selection.items() for level in levels])
+        suffix = f"?{query}" if query else ""
+        return {
+            "dataset_version": data.dataset_version(),
+            "selection": selection,
+            "tables": {
+                name: {fmt: {"url": f"/tables/{name}.{fmt}{suffix}", "etag": etag(name, fmt, selection)} for fmt in FORMATS}
+                for name in table_names()
+            },
+        }
+
+    def _not_modified(self, tag):
+        # If-None-Match may list several (possibly weak) validators
+        sent = {value.strip().removeprefix("W/").strip('"') for value in self.headers.get("If-None-Match", "").split(",")}
+        if tag not in sent and "*" not in sent:
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", f'"{tag}"')
+        self.end_headers()
+        return True
+
+    def _send(self, body, content_type, tag=None, status=HTTPStatus.OK):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if tag is not None:
+            self.send_header("ETag", f'"{tag}"')
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, document, status=HTTPStatus.OK):
+        self._send(json.dumps(document).encode(), FORMATS["json"], status=status)
+
+    def _send_error(self, status, message):
+        self._send_json({"error": message}, status)
+
+
+def serve(host="127.0.0.1", port=8502):
+    """Serve the export endpoint until interrupted."""
+    import warmup
+
+    warmup.start()
+    server = ThreadingHTTPServer((host, port), ExportHandler)
+    print(f"Serving aggregate exports on http://{host}:{server.server_port}/tables", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", default="exports", help="where exported files are written")
+    parser.add_argument("--format", nargs="+", choices=list(FORMATS), default=["csv"], dest="formats")
+    parser.add_argument(
+        "--filter", action="append", default=[], metavar="DIM=LEVEL",
+        help="keep only responses with this answer (repeatable, as in the sidebar)",
+    )
+    parser.add_argument("--serve", action="store_true", help="run the HTTP endpoint instead of writing files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.host, args.port)
+        return
+    try:
+        selection = parse_selection(item.split("=", 1) for item in args.filter)
+    except ValueError as error:
+        parser.error(str(error))
+    manifest = write(args.output_dir, args.formats, selection)
+    print(f"Wrote {len(manifest['tables'])} tables to {args.output_dir}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Process-wide LRU cache of built Plotly figures.
+
+Building a Plotly Express figure costs far more than the aggregates behind
+it, and an unchanged chart produces the same figure on every rerun. Figures
+are therefore cached under (chart name, fingerprint of the chart's inputs,
+Streamlit theme), so a rerun whose inputs did not change reuses the finished
+figure object. Entries are evicted least recently used first once either
+``MAX_FIGURES`` or ``MAX_BYTES`` (serialised JSON size) is exceeded.
+
+An optional persistent store (``set_store``) sits behind the cache: on a
+miss, a figure it already holds for the same key is loaded from it instead
+of being rebuilt, and newly built figures are handed to it. The static
+snapshot build (``snapshot``) uses this to rebuild only the charts whose
+aggregates changed since the previous build.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+MAX_FIGURES = 128
+MAX_BYTES = 64 * 2**20
+
+# key -> (figure, serialised size in bytes, build time in seconds)
+_figures = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+# Persistent second level: an object with ``load(key)`` -> figure or None
+# and ``save(key, figure)``
+_store = None
+
+
+def fingerprint(*inputs):
+    """Stable digest of chart inputs (frames, arrays, or plain hashable values)."""
+    digest = hashlib.sha1()
+    for value in inputs:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            digest.update(repr((type(value).__name__, value.shape, list(value.axes))).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        elif isinstance(value, np.ndarray):
+            digest.update(repr((value.dtype, value.shape)).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def current_theme():
+    """Active Streamlit theme ("light"/"dark"), or None outside a session."""
+    try:
+        import streamlit as st
+
+        return st.context.theme.type
+    except Exception:
+        return None
+
+
+def get_figure(name, inputs, build):
+    """Return the cached figure for ``name`` and ``inputs``, building it if needed.
+
+    ``inputs`` must capture everything the figure depends on (aggregates,
+    filter state, dataset version). The returned figure is shared between
+    sessions and reruns, so callers must not modify it.
+    """
+    global _total_bytes
+    if not isinstance(inputs, tuple):
+        inputs = (inputs,)
+    key = (name, fingerprint(*inputs), current_theme())
+    with _lock:
+        cached = _figures.get(key)
+        if cached is not None:
+            _figures.move_to_end(key)
+            return cached[0]
+
+    with profiling.span(f"figure.{name}"):
+        start = time.perf_counter()
+        figure = _store.load(key) if _store is not None else None
+        if figure is None:
+            figure = build()
+        seconds = time.perf_counter() - start
+        size = len(figure.to_json(validate=False))
+    if _store is not None:
+        _store.save(key, figure)
+    with _lock:
+        if key not in _figures:
+            _figures[key] = (figure, size, seconds)
+            _total_bytes += size
+        while _figures and (len(_figures) > MAX_FIGURES or _total_bytes > MAX_BYTES):
+            _, (_, evicted, _) = _figures.popitem(last=False)
+            _total_bytes -= evicted
+    return figure
+
+
+def set_store(store):
+    """Use ``store`` as the persistent level behind the cache (None to detach)."""
+    global _store
+    _store = store
+
+
+def stats():
+    """Current number of cached figures and their total serialised size."""
+    with _lock:
+        return {"figures": len(_figures), "bytes": _total_bytes}
+
+
+def entries():
+    """Cached figures, least recently used first, with their size and build time."""
+    with _lock:
+        return [
+            {"name": key[0], "figure": figure, "bytes": size, "build_seconds": seconds}
+            for key, (figure, size, seconds) in _figures.items()
+        ]
+
+
+def clear():
+    """Drop every cached figure."""
+    global _total_bytes
+    with _lock:
+        _figures.clear()
+        _total_bytes = 0
@@ -0,0 +1,134 @@
+"""Sidebar cross-filters shared by all three pages.
+
+A selection maps a survey dimension to the answer levels to keep. It is
+normalised into a hashable key of allowed ordinal codes, and ``BitmapIndex``
+turns that key into a row mask with a handful of vectorised OR/AND
+operations over precomputed per-level boolean arrays, so changing a filter
+never reloads the data or compares answer strings.
+
+When several survey waves are registered, the sidebar also offers a
+"Compare by wave" toggle; ``compare_panels`` then draws each chart once per
+wave, side by side.
+"""
+from functools import reduce
+
+import numpy as np
+
+import schema
+import waves
+
+# --- Filters shown in the sidebar ---
+FILTERS = {
+    "year": "Year of Study",
+    "gender": "Gender",
+    "stress": "Stress Level",
+}
+RANGE_FILTERS = {
+    "sleep_hours": "Sleep Hours",
+}
+
+# Session-state key of each filter widget
+STATE_KEYS = {dim: f"filter_{dim}" for dim in [*FILTERS, *RANGE_FILTERS]}
+COMPARE_KEY = "compare_waves"
+
+
+def from_state(state):
+    """Build a selection from the widget values stored in ``state``.
+
+    Empty multiselects mean "no filter"; range filters hold a
+    ``(low, high)`` pair of levels and keep every level in between.
+    """
+    selection = {}
+    for dim in FILTERS:
+        chosen = state.get(STATE_KEYS[dim])
+        if chosen:
+            selection[dim] = list(chosen)
+    for dim in RANGE_FILTERS:
+        bounds = state.get(STATE_KEYS[dim])
+        if bounds:
+            levels = schema.LEVELS[dim]
+            low, high = levels.index(bounds[0]), levels.index(bounds[1])
+            selection[dim] = levels[low:high + 1]
+    return selection
+
+
+def selection_key(selection=None):
+    """Hashable, order-independent key of allowed codes per filtered dimension.
+
+    Dimensions whose selection covers every level are dropped, so "all
+    years selected" and "no year filter" share one key (and one cache entry).
+    """
+    key = []
+    for dim, chosen in sorted((selection or {}).items()):
+        levels = schema.LEVELS[dim]
+        allowed = tuple(sorted({levels.index(level) for level in chosen}))
+        if len(allowed) < len(levels):
+            key.append((dim, allowed))
+    return tuple(key)
+
+
+class BitmapIndex:
+    """One boolean array per (dimension, level) for fast row masks."""
+
+    def __init__(self, df, dims=None):
+        self._bitmaps = {}
+        for dim in dims or [*FILTERS, *RANGE_FILTERS]:
+            codes = df[dim].cat.codes.to_numpy()
+            self._bitmaps[dim] = [codes == code for code in range(len(df[dim].cat.categories))]
+
+    def mask(self, key):
+        """Row mask for a ``selection_key``, or None when nothing is filtered."""
+        mask = None
+        for dim, allowed in key:
+            bitmaps = self._bitmaps[dim]
+            if allowed:
+                dim_mask = reduce(np.logical_or, (bitmaps[code] for code in allowed))
+            else:
+                dim_mask = np.zeros_like(bitmaps[0])
+            mask = dim_mask if mask is None else mask & dim_mask
+        return mask
+
+
+def sidebar():
+    """Render the filter widgets in the sidebar (call once from ``app.py``)."""
+    import streamlit as st
+
+    with st.sidebar:
+        st.header("🔎 Filters")
+        for dim, label in FILTERS.items():
+            st.multiselect(label, schema.LEVELS[dim], key=STATE_KEYS[dim], placeholder="All")
+        for dim, label in RANGE_FILTERS.items():
+            levels = schema.LEVELS[dim]
+            st.select_slider(label, options=levels, value=(levels[0], levels[-1]), key=STATE_KEYS[dim])
+        if len(waves.names()) > 1:
+            st.toggle(
+                "Compare by wave",
+                key=COMPARE_KEY,
+                help=f"Draw every chart once per survey wave ({', '.join(waves.names())})"
+            )
+
+
+def compare_by(state):
+    """Dimension to facet the charts by (the wave), or None when not comparing."""
+    if state.get(COMPARE_KEY) and len(waves.names()) > 1:
+        return waves.COLUMN
+    return None
+
+
+def compare_panels(cube, state):
+    """Yield the cube each chart is drawn from.
+
+    Normally that is ``cube`` itself, once. When comparing waves it is each
+    wave's facet in turn, inside its own column headed by the wave name.
+    """
+    import streamlit as st
+
+    by = compare_by(state)
+    facets = cube.facets(by) if by in cube.dims else {}
+    if not facets:
+        yield cube
+        return
+    for column, (level, facet) in zip(st.columns(len(facets)), facets.items()):
+        with column:
+            st.markdown(f"**{level}** ({facet.n_rows:,} responses)")
+            yield facet
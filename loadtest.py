@@ -0,0 +1,194 @@
+"""Load test: concurrent sessions clicking through the dashboard.
+
+    python loadtest.py                                   # 1, 10 and 50 sessions
+    python loadtest.py --sessions 20 --rounds 5 --rows 100000 --output load.json
+
+Every session is a headless Streamlit app (``AppTest``) on its own thread,
+all in one server-like process, so they share the data layer exactly as the
+sessions of one Streamlit server do. After a first run, each round a session
+changes one sidebar filter at random and then visits the three pages; on its
+first round it also opens every on-demand section. Sessions start together
+and run concurrently.
+
+Each session count is measured in a fresh worker process (pointed at the
+data with ``SURVEY_DATA_FILE``), and the report gives the p50/p95/max rerun
+latency overall and per page, plus the process RSS before the sessions
+start, its peak while they run, and the growth per session.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+SESSIONS = [1, 10, 50]
+ROUNDS = 3
+PAGES = ["page1_objective1.py", "page2_objective2.py", "page3_objective3.py"]
+# RSS is sampled this often while the sessions run
+SAMPLE_SECONDS = 0.05
+
+
+def rss_bytes():
+    """Current resident set size of this process (None where unsupported)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _percentiles(values):
+    import numpy as np
+
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"p50": float(p50), "p95": float(p95), "max": float(max(values))}
+
+
+# --- One simulated user (run inside a worker process) ---
+def _session(seed, rounds, start, latencies, errors):
+    """Click through the pages ``rounds`` times, recording ``(page, seconds)``."""
+    import analytics
+    import filters
+    import schema
+    from streamlit.testing.v1 import AppTest
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    rng = random.Random(seed)
+    sections = analytics.SECTIONS
+
+    def rerun(app, page):
+        began = time.perf_counter()
+        app.run()
+        latencies.append((page, time.perf_counter() - began))
+        if app.exception:
+            errors.append(f"{page}: {app.exception[0].message}")
+
+    app = AppTest.from_file(os.path.join(here, "app.py"), default_timeout=600)
+    start.wait()
+    rerun(app, PAGES[0])
+    for round_ in range(rounds):
+        dim = rng.choice(list(filters.FILTERS))
+        levels = schema.LEVELS[dim]
+        app.session_state[filters.STATE_KEYS[dim]] = rng.sample(levels, rng.randint(0, len(levels) - 1))
+        for page in PAGES:
+            if round_ == 0:
+                for key in sections:
+                    app.session_state[key] = True
+            app.switch_page(page)
+            rerun(app, page)
+
+
+def run_worker(sessions, rounds, seed=0):
+    """Run ``sessions`` concurrent sessions for ``rounds`` rounds each."""
+    import plotly.express  # noqa: F401
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+    import data
+
+    # modules and data are loaded once before the clock starts, as on a running
+    # server, so the RSS growth is what the sessions themselves cost
+    data.load_cube()
+    baseline = rss_bytes()
+    latencies, errors, samples = [], [], []
+    start = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=_session, args=(seed + n, rounds, start, latencies, errors))
+        for n in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    while any(thread.is_alive() for thread in threads):
+        samples.append(rss_bytes())
+        time.sleep(SAMPLE_SECONDS)
+    elapsed = time.perf_counter() - began
+    samples.append(rss_bytes())
+
+    peak = max(samples) if baseline is not None else None
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "rows": data.load_cube().n_rows,
+        "reruns": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "latency_seconds": _percentiles([seconds for _, seconds in latencies]),
+        "pages": {
+            page: _percentiles([seconds for name, seconds in latencies if name == page])
+            for page in PAGES
+        },
+        "rss_bytes": {
+            "baseline": baseline,
+            "peak": peak,
+            "per_session": None if peak is None else (peak - baseline) / sessions,
+        },
+    }
+
+
+# --- Driver ---
+def run(sessions=SESSIONS, rounds=ROUNDS, data_file=None, seed=0):
+    """Measure each session count in its own process."""
+    env = dict(os.environ)
+    if data_file:
+        env["SURVEY_DATA_FILE"] = data_file
+    results = []
+    for count in sessions:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(count),
+             "--rounds", str(rounds), "--seed", str(seed)],
+            env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Load test worker failed for {count} sessions:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        latency = result["latency_seconds"]
+        print(
+            f"{count:>5} sessions: p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms",
+            file=sys.stderr,
+        )
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=SESSIONS, help="concurrent session counts")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="filter changes (page tours) per session")
+    parser.add_argument("--rows", type=int, help="use a synthetic export of this many rows (see benchmark.py)")
+    parser.add_argument("--data", help="survey CSV to serve (default: SURVEY_DATA_FILE or the bundled one)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--worker", type=int, metavar="SESSIONS", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.rounds, args.seed)))
+        return
+    data_file = args.data
+    if args.rows:
+        import benchmark
+
+        data_file = benchmark.dataset(args.rows, seed=args.seed)
+    report = json.dumps(run(args.sessions, args.rounds, data_file, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
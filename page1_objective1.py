@@ -1,19 +1,24 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import numpy as np # Included for robust category ordering
+import analytics
+import charts
+import figure_cache
+import filters
+import profiling
+import schema
+import sketch
+from data import is_streaming, load_cube, load_head, load_sketch
 
 # --- Streamlit Page Config ---
 st.set_page_config(page_title="Student Sleep & Stress Dashboard", layout="wide")
 
 # --- Load Data ---
-@st.cache_data
-def load_data():
-    url = 'https://raw.githubusercontent.com/aleya566/assignment/refs/heads/main/Student%20Insomnia%20and%20Educational%20Outcomes%20Dataset.csv'
-    df = pd.read_csv(url)
-    return df
-
-df = load_data()
+# Sidebar filters (set in app.py) -> matching aggregate cube; every chart
+# and metric is answered from it, so no page touches the raw rows.
+selection = filters.from_state(st.session_state)
+with profiling.span("load"):
+    cube = load_cube(selection)
+    total_responses = load_cube().n_rows
 
 # --- Page Title ---
 st.title("📊 Student Insomnia and Educational Outcomes Dashboard")
@@ -22,36 +27,35 @@ st.markdown("""
 Explore the relationships between **sleep habits, stress levels, and academic performance** among students.
 """)
 
+if is_streaming():
+    st.caption(f"🌊 Streaming mode: {cube.n_rows:,} responses summarised from aggregates; filters are not applied")
+elif filters.selection_key(selection):
+    st.caption(f"🔎 Filtered view: {cube.n_rows:,} of {total_responses:,} responses")
+
 # ==============================================
 # 🔹 Key Metrics Section
 # ==============================================
 col1, col2, col3, col4 = st.columns(4)
 
-# Clean numeric values for sleep hours
-sleep_col = '4. On average, how many hours of sleep do you get on a typical day?'
-
-# Try to extract numbers even if text contains words (e.g., "6 hours")
-# NOTE: Using a simpler conversion assuming the string starts with the number
-df[sleep_col] = df[sleep_col].astype(str).str.extract(r'(\d+\.?\d*)')
-df[sleep_col] = pd.to_numeric(df[sleep_col], errors='coerce')
-
-# Compute summary metrics safely
-avg_sleep = df[sleep_col].mean()
-
-# Handle categorical columns robustly (avoid KeyErrors)
-stress_col = '14. How would you describe your stress levels related to academic workload?'
-gpa_col = '15. How would you rate your overall academic performance (GPA or grades) in the past semester?'
-gender_col = '2. What is your gender?'
-
-avg_stress = df[stress_col].mode()[0] if not df[stress_col].empty else "N/A"
-avg_gpa = df[gpa_col].mode()[0] if not df[gpa_col].empty else "N/A"
-gender_ratio = df[gender_col].value_counts(normalize=True).idxmax() if not df[gender_col].empty else "N/A"
+# Sketch mode (SURVEY_SKETCH_METRICS=1): cards are read from a constant-size
+# summary and show their 95% error bound
+summary = load_sketch(selection) if sketch.enabled() else cube
+# Sleep hours are scored at the midpoint of each reported range (e.g. "7-8 hours" -> 7.5)
+metrics = analytics.sleep_overview(summary)
+bounds = analytics.metric_bounds(summary, metrics)
+avg_sleep = metrics['avg_sleep_hours']
+avg_stress = metrics['common_stress'] or "N/A"
+avg_gpa = metrics['common_performance'] or "N/A"
+gender_ratio = metrics['majority_gender'] or "N/A"
 
 # Display metrics
 col1.metric(
     label="🕒 Average Sleep Hours",
     value=f"{avg_sleep:.1f} hrs" if not pd.isna(avg_sleep) else "N/A",
     help="Average number of sleep hours reported by students",
+    delta=bounds.get('avg_sleep_hours'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
@@ -59,6 +63,9 @@ col2.metric(
     label="😰 Most Common Stress Level",
     value=avg_stress,
     help="Most frequently reported academic stress level",
+    delta=bounds.get('common_stress'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
@@ -66,6 +73,9 @@ col3.metric(
     label="🎓 Typical Academic Performance",
     value=avg_gpa,
     help="Most commonly reported GPA/grade category",
+    delta=bounds.get('common_performance'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
@@ -73,110 +83,136 @@ col4.metric(
     label="🚻 Majority Gender",
     value=gender_ratio,
     help="Gender with highest participation",
+    delta=bounds.get('majority_gender'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
 
 # --- Show Data ---
-with st.expander("🔍 View Dataset"):
-    st.dataframe(df.head())
+dataset_preview = st.expander("🔍 View Dataset", key="dataset_preview_1", on_change="rerun")
+if dataset_preview.open:
+    with dataset_preview:
+        st.dataframe(load_head(selection)[list(schema.QUESTIONS)].rename(columns=schema.QUESTIONS))
 
 # ==============================================
 # 1️⃣ Stacked Bar Chart – Stress Levels by Year of Study
 # ==============================================
 st.subheader("🎓 Academic Stress Levels by Year of Study")
 
-stress_year_crosstab = pd.crosstab(
-    df['1. What is your year of study?'],
-    df['14. How would you describe your stress levels related to academic workload?'],
-    normalize='index'
-)
-
-stress_year_crosstab = stress_year_crosstab.reset_index().melt(
-    id_vars='1. What is your year of study?',
-    var_name='Stress Level',
-    value_name='Proportion'
-)
-
-fig1 = px.bar(
-    stress_year_crosstab,
-    x='1. What is your year of study?',
-    y='Proportion',
-    color='Stress Level',
-    title='Academic Stress Levels by Year of Study',
-    barmode='stack',
-    color_discrete_sequence=px.colors.sequential.Sunset
-)
-
-fig1.update_layout(xaxis_title="Year of Study", yaxis_title="Proportion")
-st.plotly_chart(fig1, use_container_width=True)
+for panel in filters.compare_panels(cube, st.session_state):
+    stress_year_crosstab = analytics.stress_by_year(panel)
+
+    def build_stress_year_figure():
+        import plotly.express as px
+
+        fig = px.bar(
+            stress_year_crosstab,
+            x='year',
+            y='Proportion',
+            color='Stress Level',
+            title='Academic Stress Levels by Year of Study',
+            barmode='stack',
+            category_orders={'Stress Level': schema.LEVELS['stress'], 'year': schema.LEVELS['year']},
+            color_discrete_sequence=px.colors.sequential.Sunset
+        )
+        fig.update_layout(xaxis_title="Year of Study", yaxis_title="Proportion")
+        return fig
+
+    # Figures are cached by their inputs, so an unchanged chart is not rebuilt
+    fig1 = figure_cache.get_figure('stress_by_year', stress_year_crosstab, build_stress_year_figure)
+    with profiling.span("send.stress_by_year"):
+        st.plotly_chart(fig1, use_container_width=True)
 
 # ==============================================
 # 2️⃣ Box Plot – Sleep Hours by Gender
 # ==============================================
-st.subheader("😴 Average Sleep Hours by Gender")
-
-fig2 = px.box(
-    df,
-    x='2. What is your gender?',
-    y='4. On average, how many hours of sleep do you get on a typical day?',
-    color='2. What is your gender?',
-    title='Average Sleep Hours by Gender',
-    color_discrete_sequence=px.colors.sequential.Sunset
+# Below the fold: computed and drawn only once the section is opened
+sleep_hours_by_gender_section = st.expander(
+    "😴 Average Sleep Hours by Gender",
+    key="sleep_hours_by_gender_section",
+    on_change="rerun"
 )
-
-fig2.update_layout(xaxis_title="Gender", yaxis_title="Average Sleep Hours")
-st.plotly_chart(fig2, use_container_width=True)
+if sleep_hours_by_gender_section.open:
+    with sleep_hours_by_gender_section:
+        for panel in filters.compare_panels(cube, st.session_state):
+            # Quartiles/whiskers come from the cube, so the chart payload does not grow with the rows
+            sleep_gender = analytics.sleep_hours_by_gender(panel)
+
+            def build_sleep_gender_figure():
+                import plotly.express as px
+
+                fig = charts.box_from_stats(
+                    sleep_gender['stats'],
+                    title='Average Sleep Hours by Gender',
+                    colors=px.colors.sequential.Sunset,
+                    legend_title=schema.LABELS['gender'],
+                    counts=sleep_gender['counts'],
+                    values=schema.score_table('sleep_hours')
+                )
+                fig.update_layout(xaxis_title="Gender", yaxis_title="Average Sleep Hours")
+                return fig
+
+            fig2 = figure_cache.get_figure(
+                'sleep_hours_by_gender',
+                (sleep_gender['stats'], sleep_gender['counts']),
+                build_sleep_gender_figure
+            )
+            with profiling.span("send.sleep_hours_by_gender"):
+                st.plotly_chart(fig2, use_container_width=True)
 
 # ==============================================
 # 3️⃣ Stacked Bar Chart – Sleep Quality by Year of Study
 # ==============================================
-st.subheader("🌙 Sleep Quality by Year of Study")
-st.markdown("Proportion of students in each year of study reporting different levels of sleep quality.")
-
-# 1. Create the normalized crosstab
-sleep_quality_year_crosstab = pd.crosstab(
-    df['1. What is your year of study?'], 
-    df['6. How would you rate the overall quality of your sleep?'], 
-    normalize='index'
-)
-
-# 2. Convert the wide crosstab format to a long format (melt) for Plotly Express
-plot_data_sleep_year = sleep_quality_year_crosstab.reset_index()
-plot_data_sleep_year = plot_data_sleep_year.melt(
-    id_vars='1. What is your year of study?',
-    var_name='Sleep Quality',
-    value_name='Proportion'
-)
-
-# Define the category orders for consistent visualization
-sleep_quality_order = ['Very Poor', 'Poor', 'Average', 'Good', 'Very Good']
-# Ensure Year of Study is ordered logically (if possible, otherwise alphabetical)
-year_of_study_order = sorted(plot_data_sleep_year['1. What is your year of study?'].unique())
-
-# 3. Create the Plotly Stacked Bar Chart
-fig_sleep_year = px.bar(
-    plot_data_sleep_year,
-    x='1. What is your year of study?',
-    y='Proportion',
-    color='Sleep Quality',
-    barmode='stack', # Key for stacked bar chart
-    category_orders={
-        'Sleep Quality': sleep_quality_order,
-        '1. What is your year of study?': year_of_study_order 
-    },
-    title='Sleep Quality by Year of Study',
-    color_discrete_sequence=px.colors.sequential.Plasma_r # Color scheme similar to 'flare'
-)
-
-# 4. Update layout and display
-fig_sleep_year.update_layout(
-    xaxis_title="Year of Study", 
-    yaxis_title="Proportion of Students",
-    xaxis={'tickangle': 45}, # Rotate X-axis labels for readability
-    legend_title_text='Sleep Quality'
+# Below the fold: computed and drawn only once the section is opened
+sleep_quality_by_year_section = st.expander(
+    "🌙 Sleep Quality by Year of Study",
+    key="sleep_quality_by_year_section",
+    on_change="rerun"
 )
-st.plotly_chart(fig_sleep_year, use_container_width=True)
+if sleep_quality_by_year_section.open:
+    with sleep_quality_by_year_section:
+        st.markdown("Proportion of students in each year of study reporting different levels of sleep quality.")
+
+        for panel in filters.compare_panels(cube, st.session_state):
+            # 1. Normalized crosstab in long format for Plotly Express
+            plot_data_sleep_year = analytics.sleep_quality_by_year(panel)
+
+            # Category orders for consistent visualization come from the shared schema
+            sleep_quality_order = schema.LEVELS['sleep_quality']
+            year_of_study_order = schema.LEVELS['year']
+
+            def build_sleep_year_figure():
+                import plotly.express as px
+
+                # 2. Create the Plotly Stacked Bar Chart
+                fig = px.bar(
+                    plot_data_sleep_year,
+                    x='year',
+                    y='Proportion',
+                    color='Sleep Quality',
+                    barmode='stack', # Key for stacked bar chart
+                    category_orders={
+                        'Sleep Quality': sleep_quality_order,
+                        'year': year_of_study_order
+                    },
+                    title='Sleep Quality by Year of Study',
+                    color_discrete_sequence=px.colors.sequential.Plasma_r # Color scheme similar to 'flare'
+                )
+
+                # 3. Update layout
+                fig.update_layout(
+                    xaxis_title="Year of Study",
+                    yaxis_title="Proportion of Students",
+                    xaxis={'tickangle': 45}, # Rotate X-axis labels for readability
+                    legend_title_text='Sleep Quality'
+                )
+                return fig
+
+            fig_sleep_year = figure_cache.get_figure('sleep_quality_by_year', plot_data_sleep_year, build_sleep_year_figure)
+            with profiling.span("send.sleep_quality_by_year"):
+                st.plotly_chart(fig_sleep_year, use_container_width=True)
 
 # --- Footer ---
 st.markdown("---")
@@ -1,19 +1,22 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.figure_factory as ff
+import analytics
+import figure_cache
+import filters
+import profiling
+import schema
+import sketch
+from data import is_streaming, load_cube, load_head, load_sketch
 
 # --- Streamlit Page Config ---
 st.set_page_config(page_title="Student Lifestyle & Sleep Analysis", layout="wide")
 
 # --- Load Data ---
-@st.cache_data
-def load_data():
-    url = 'https://raw.githubusercontent.com/aleya566/assignment/refs/heads/main/Student%20Insomnia%20and%20Educational%20Outcomes%20Dataset.csv'
-    df = pd.read_csv(url)
-    return df
-
-df = load_data()
+# Sidebar filters (set in app.py) -> matching aggregate cube; every chart
+# and metric is answered from it, so no page touches the raw rows.
+selection = filters.from_state(st.session_state)
+with profiling.span("load"):
+    cube = load_cube(selection)
+    total_responses = load_cube().n_rows
 
 # --- Page Title ---
 st.title("😴 Student Lifestyle Behaviors and Sleep Quality Dashboard")
@@ -22,22 +25,26 @@ st.markdown("""
 Analyze how **caffeine consumption**, **physical activity**, and **device usage** influence students' **sleep quality**.
 """)
 
+if is_streaming():
+    st.caption(f"🌊 Streaming mode: {cube.n_rows:,} responses summarised from aggregates; filters are not applied")
+elif filters.selection_key(selection):
+    st.caption(f"🔎 Filtered view: {cube.n_rows:,} of {total_responses:,} responses")
+
 # ==============================================
 # 🔹 Key Metrics Section (matching Objective 1)
 # ==============================================
 col1, col2, col3, col4 = st.columns(4)
 
-# Columns of interest
-sleep_quality_col = '6. How would you rate the overall quality of your sleep?'
-caffeine_col = '12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?'
-device_col = '11. How often do you use electronic devices (e.g., phone, computer) before going to sleep?'
-exercise_col = '13. How often do you engage in physical activity or exercise?'
-
 # Calculate key metrics
-most_common_sleep_quality = df[sleep_quality_col].mode()[0] if not df[sleep_quality_col].empty else "N/A"
-most_common_caffeine = df[caffeine_col].mode()[0] if not df[caffeine_col].empty else "N/A"
-most_common_device = df[device_col].mode()[0] if not df[device_col].empty else "N/A"
-most_common_exercise = df[exercise_col].mode()[0] if not df[exercise_col].empty else "N/A"
+# Sketch mode (SURVEY_SKETCH_METRICS=1): cards are read from a constant-size
+# summary and show their 95% error bound
+summary = load_sketch(selection) if sketch.enabled() else cube
+metrics = analytics.lifestyle_overview(summary)
+bounds = analytics.metric_bounds(summary, metrics)
+most_common_sleep_quality = metrics['common_sleep_quality'] or "N/A"
+most_common_caffeine = metrics['common_caffeine'] or "N/A"
+most_common_device = metrics['common_device_use'] or "N/A"
+most_common_exercise = metrics['common_exercise'] or "N/A"
 
 # --- Display Metrics with Plain Grey Borders ---
 
@@ -45,152 +52,178 @@ col1.metric(
     label="💤 Most Common Sleep Quality",
     value=most_common_sleep_quality,
     help="Most frequently reported sleep quality rating",
+    delta=bounds.get('common_sleep_quality'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col2.metric(
     label="☕ Typical Caffeine Use",
     value=most_common_caffeine,
     help="Most common caffeine consumption frequency",
+    delta=bounds.get('common_caffeine'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col3.metric(
     label="📱 Typical Device Usage",
     value=most_common_device,
     help="Most common frequency of device use before sleep",
+    delta=bounds.get('common_device_use'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col4.metric(
     label="🏃 Typical Physical Activity",
     value=most_common_exercise,
     help="Most common frequency of physical activity",
+    delta=bounds.get('common_exercise'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
 # --- Show Data ---
-with st.expander("🔍 View Dataset"):
-    st.dataframe(df.head())
+dataset_preview = st.expander("🔍 View Dataset", key="dataset_preview_2", on_change="rerun")
+if dataset_preview.open:
+    with dataset_preview:
+        st.dataframe(load_head(selection)[list(schema.QUESTIONS)].rename(columns=schema.QUESTIONS))
 
 # ==========================================================
 # 1️⃣ Correlation Heatmap – Behaviors vs Sleep Issues
 # ==========================================================
 st.subheader("🧠 Correlation: Lifestyle Behaviors vs Sleep Issues")
 
-behavior_sleep_df = df[[
-    '3. How often do you have difficulty falling asleep at night? ',
-    '5. How often do you wake up during the night and have trouble falling back asleep?',
-    '6. How would you rate the overall quality of your sleep?',
-    '11. How often do you use electronic devices (e.g., phone, computer) before going to sleep?',
-    '12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?',
-    '13. How often do you engage in physical activity or exercise?'
-]].copy()
-
-behavior_sleep_df.columns = [
-    'Difficulty falling asleep',
-    'Nighttime awakenings',
-    'Overall sleep quality',
-    'Electronic device use before sleep',
-    'Caffeine consumption',
-    'Physical activity'
-]
-
-for col in behavior_sleep_df.columns:
-    behavior_sleep_df[col], _ = pd.factorize(behavior_sleep_df[col])
-
-correlation_matrix = behavior_sleep_df.corr()
-
-fig1 = ff.create_annotated_heatmap(
-    z=correlation_matrix.values,
-    x=list(correlation_matrix.columns),
-    y=list(correlation_matrix.index),
-    annotation_text=correlation_matrix.round(2).values,
-    colorscale=px.colors.sequential.Sunset,
-    showscale=True
+correlation_methods = {
+    'Spearman': 'spearman',
+    'Kendall': 'kendall',
+    'Polychoric': 'polychoric',
+}
+method_col, scope_col = st.columns([3, 1])
+correlation_method = method_col.radio(
+    "Correlation method",
+    list(correlation_methods),
+    horizontal=True,
+    help="Rank correlations of the ordered answers; polychoric estimates the correlation of the underlying continuous traits"
 )
-fig1.update_layout(
-    title="Correlation Matrix of Behaviors and Sleep Issues",
-    xaxis=dict(title="Variables"),
-    yaxis=dict(title="Variables"),
-    title_font=dict(size=18)
+all_ordinal = scope_col.toggle(
+    "All ordinal questions",
+    help=f"Correlate all {len(schema.ORDINAL)} ordinal survey questions instead of the lifestyle behaviors"
 )
-st.plotly_chart(fig1, use_container_width=True)
+correlation_cols = schema.ORDINAL if all_ordinal else analytics.BEHAVIORS
+
+for panel in filters.compare_panels(cube, st.session_state):
+    # Computed from the true answer order in one batched pass and memoised per filter state
+    correlation_matrix = analytics.behavior_correlation(
+        panel,
+        method=correlation_methods[correlation_method],
+        dims=correlation_cols
+    )
+
+    def build_correlation_figure():
+        import plotly.express as px
+        import plotly.figure_factory as ff
+
+        fig = ff.create_annotated_heatmap(
+            z=correlation_matrix.values,
+            x=list(correlation_matrix.columns),
+            y=list(correlation_matrix.index),
+            annotation_text=correlation_matrix.round(2).values,
+            colorscale=px.colors.sequential.Sunset,
+            showscale=True
+        )
+        fig.update_layout(
+            title=f"{correlation_method} Correlation Matrix of Behaviors and Sleep Issues",
+            xaxis=dict(title="Variables"),
+            yaxis=dict(title="Variables"),
+            title_font=dict(size=18),
+            height=max(450, 50 * len(correlation_cols))
+        )
+        return fig
+
+    # Figures are cached by their inputs, so an unchanged chart is not rebuilt
+    fig1 = figure_cache.get_figure(
+        'behavior_correlation',
+        (correlation_method, correlation_matrix),
+        build_correlation_figure
+    )
+    with profiling.span("send.behavior_correlation"):
+        st.plotly_chart(fig1, use_container_width=True)
 
 # ==========================================================
 # 2️⃣ Heatmap – Sleep Hours vs Device Use
 # ==========================================================
-st.subheader("📱 Average Sleep Hours vs Electronic Device Use Before Sleep")
-
-sleep_device_df = df[[
-    '4. On average, how many hours of sleep do you get on a typical day?',
-    '11. How often do you use electronic devices (e.g., phone, computer) before going to sleep?'
-]].copy()
-
-sleep_device_df.columns = ['Average hours of sleep', 'Electronic device use before sleep']
-
-sleep_hour_mapping = {
-    'Less than 4 hours': 3, '4-5 hours': 4.5, '5-6 hours': 5.5,
-    '6-7 hours': 6.5, '7-8 hours': 7.5, 'More than 8 hours': 9
-}
-device_use_mapping = {
-    'Never': 0, 'Rarely (1-2 times a week)': 1.5, 'Sometimes (3-4 times a week)': 3.5,
-    'Often (5-6 times a week)': 5.5, 'Every night': 7
-}
-
-sleep_device_df['Sleep_hours_numeric'] = sleep_device_df['Average hours of sleep'].map(sleep_hour_mapping)
-sleep_device_df['Device_use_numeric'] = sleep_device_df['Electronic device use before sleep'].map(device_use_mapping)
-
-heatmap_data = sleep_device_df.pivot_table(
-    index='Sleep_hours_numeric',
-    columns='Device_use_numeric',
-    aggfunc='size',
-    fill_value=0
-)
-
-fig2 = px.imshow(
-    heatmap_data,
-    text_auto=True,
-    color_continuous_scale='Sunset',
-    title='Density of Observations: Average Sleep Hours vs Device Use'
+# Below the fold: computed and drawn only once the section is opened
+sleep_hours_by_device_use_section = st.expander(
+    "📱 Average Sleep Hours vs Electronic Device Use Before Sleep",
+    key="sleep_hours_by_device_use_section",
+    on_change="rerun"
 )
-fig2.update_layout(
-    xaxis_title="Device Use Frequency (Numeric Scale)",
-    yaxis_title="Average Sleep Hours (Numeric Scale)"
-)
-st.plotly_chart(fig2, use_container_width=True)
+if sleep_hours_by_device_use_section.open:
+    with sleep_hours_by_device_use_section:
+        for panel in filters.compare_panels(cube, st.session_state):
+            # Count grid labelled with the numeric scales (hours per night, nights per week)
+            heatmap_data = analytics.sleep_hours_by_device_use(panel)
+
+            def build_sleep_device_figure():
+                import plotly.express as px
+
+                fig = px.imshow(
+                    heatmap_data,
+                    text_auto=True,
+                    color_continuous_scale='Sunset',
+                    title='Density of Observations: Average Sleep Hours vs Device Use'
+                )
+                fig.update_layout(
+                    xaxis_title="Device Use Frequency (Numeric Scale)",
+                    yaxis_title="Average Sleep Hours (Numeric Scale)"
+                )
+                return fig
+
+            fig2 = figure_cache.get_figure('sleep_hours_by_device_use', heatmap_data, build_sleep_device_figure)
+            with profiling.span("send.sleep_hours_by_device_use"):
+                st.plotly_chart(fig2, use_container_width=True)
 
 # ==========================================================
 # 3️⃣ Grouped Bar Chart – Sleep Quality by Caffeine Frequency
 # ==========================================================
-st.subheader("☕ Sleep Quality Ratings by Caffeine Consumption Frequency")
-
-caffeine_sleep_df = df[df['12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?'].isin([
-    'Never', 'Rarely (1-2 times a week)', 'Sometimes (3-4 times a week)', 'Often (5-6 times a week)', 'Every day'
-])].copy()
-
-caffeine_sleep_crosstab = pd.crosstab(
-    caffeine_sleep_df['12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?'],
-    caffeine_sleep_df['6. How would you rate the overall quality of your sleep?'],
-    normalize='index'
-).reset_index().melt(
-    id_vars='12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?',
-    var_name='Sleep Quality',
-    value_name='Proportion'
-)
-
-fig3 = px.bar(
-    caffeine_sleep_crosstab,
-    x='12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?',
-    y='Proportion',
-    color='Sleep Quality',
-    barmode='group',
-    title='Sleep Quality Ratings by Caffeine Consumption Frequency',
-    color_discrete_sequence=px.colors.sequential.Sunset
-)
-fig3.update_layout(
-    xaxis_title='Caffeine Consumption Frequency',
-    yaxis_title='Proportion',
-    xaxis_tickangle=45
+# Below the fold: computed and drawn only once the section is opened
+sleep_quality_by_caffeine_section = st.expander(
+    "☕ Sleep Quality Ratings by Caffeine Consumption Frequency",
+    key="sleep_quality_by_caffeine_section",
+    on_change="rerun"
 )
-st.plotly_chart(fig3, use_container_width=True)
+if sleep_quality_by_caffeine_section.open:
+    with sleep_quality_by_caffeine_section:
+        for panel in filters.compare_panels(cube, st.session_state):
+            # Unknown caffeine answers are already dropped by the cube
+            caffeine_sleep_crosstab = analytics.sleep_quality_by_caffeine(panel)
+
+            def build_caffeine_sleep_figure():
+                import plotly.express as px
+
+                fig = px.bar(
+                    caffeine_sleep_crosstab,
+                    x='caffeine',
+                    y='Proportion',
+                    color='Sleep Quality',
+                    barmode='group',
+                    category_orders={'caffeine': schema.LEVELS['caffeine'], 'Sleep Quality': schema.LEVELS['sleep_quality']},
+                    title='Sleep Quality Ratings by Caffeine Consumption Frequency',
+                    color_discrete_sequence=px.colors.sequential.Sunset
+                )
+                fig.update_layout(
+                    xaxis_title='Caffeine Consumption Frequency',
+                    yaxis_title='Proportion',
+                    xaxis_tickangle=45
+                )
+                return fig
+
+            fig3 = figure_cache.get_figure('sleep_quality_by_caffeine', caffeine_sleep_crosstab, build_caffeine_sleep_figure)
+            with profiling.span("send.sleep_quality_by_caffeine"):
+                st.plotly_chart(fig3, use_container_width=True)
 
 # --- Footer ---
 st.markdown("---")
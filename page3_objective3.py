@@ -1,19 +1,23 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.figure_factory as ff
+import analytics
+import charts
+import figure_cache
+import filters
+import profiling
+import schema
+import sketch
+from data import is_streaming, load_cube, load_head, load_sketch
 
 # --- Streamlit Page Config ---
 st.set_page_config(page_title="Impact of Sleep Issues on Academic Performance", layout="wide")
 
 # --- Load Dataset ---
-@st.cache_data
-def load_data():
-    url = 'https://raw.githubusercontent.com/aleya566/assignment/refs/heads/main/Student%20Insomnia%20and%20Educational%20Outcomes%20Dataset.csv'
-    df = pd.read_csv(url)
-    return df
-
-df = load_data()
+# Sidebar filters (set in app.py) -> matching aggregate cube; every chart
+# and metric is answered from it, so no page touches the raw rows.
+selection = filters.from_state(st.session_state)
+with profiling.span("load"):
+    cube = load_cube(selection)
+    total_responses = load_cube().n_rows
 
 # --- Page Header ---
 st.title("🧠 Impact of Sleep-Related Issues on Academic Performance")
@@ -21,154 +25,244 @@ st.markdown("""
 Explore how **sleep difficulties, fatigue, and insufficient rest** influence students' **academic performance**.
 """)
 
+if is_streaming():
+    st.caption(f"🌊 Streaming mode: {cube.n_rows:,} responses summarised from aggregates; filters are not applied")
+elif filters.selection_key(selection):
+    st.caption(f"🔎 Filtered view: {cube.n_rows:,} of {total_responses:,} responses")
+
 # ==============================================
 # 🔹 Key Metrics Section (Plain Grey Border)
 # ==============================================
 col1, col2, col3, col4 = st.columns(4)
 
-# Define key columns
-performance_col = '15. How would you rate your overall academic performance (GPA or grades) in the past semester?'
-concentration_col = '7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?'
-fatigue_col = '8. How often do you feel fatigued during the day, affecting your ability to study or attend classes?'
-sleep_impact_col = '10. How would you describe the impact of insufficient sleep on your ability to complete assignments and meet deadlines?'
-
 # Calculate summary metrics
-common_performance = df[performance_col].mode()[0] if not df[performance_col].empty else "N/A"
-common_concentration = df[concentration_col].mode()[0] if not df[concentration_col].empty else "N/A"
-common_fatigue = df[fatigue_col].mode()[0] if not df[fatigue_col].empty else "N/A"
-common_sleep_impact = df[sleep_impact_col].mode()[0] if not df[sleep_impact_col].empty else "N/A"
+# Sketch mode (SURVEY_SKETCH_METRICS=1): cards are read from a constant-size
+# summary and show their 95% error bound
+summary = load_sketch(selection) if sketch.enabled() else cube
+metrics = analytics.performance_overview(summary)
+bounds = analytics.metric_bounds(summary, metrics)
+common_performance = metrics['common_performance'] or "N/A"
+common_concentration = metrics['common_concentration'] or "N/A"
+common_fatigue = metrics['common_fatigue'] or "N/A"
+common_sleep_impact = metrics['common_sleep_impact'] or "N/A"
 
 # --- Display Metrics ---
 col1.metric(
     label="🎓 Most Common Academic Performance",
     value=common_performance,
     help="Most frequently reported academic performance level",
+    delta=bounds.get('common_performance'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col2.metric(
     label="🧩 Common Concentration Difficulty",
     value=common_concentration,
     help="Most common frequency of difficulty concentrating",
+    delta=bounds.get('common_concentration'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col3.metric(
     label="💤 Typical Fatigue Level",
     value=common_fatigue,
     help="Most common fatigue frequency reported by students",
+    delta=bounds.get('common_fatigue'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 col4.metric(
     label="📦 Impact of Insufficient Sleep",
     value=common_sleep_impact,
     help="Most common reported impact of insufficient sleep on assignments",
+    delta=bounds.get('common_sleep_impact'),
+    delta_color="off",
+    delta_arrow="off",
     border=True
 )
 
 # --- Dataset Preview ---
-with st.expander("🔍 View Dataset"):
-    st.dataframe(df.head())
+dataset_preview = st.expander("🔍 View Dataset", key="dataset_preview_3", on_change="rerun")
+if dataset_preview.open:
+    with dataset_preview:
+        st.dataframe(load_head(selection)[list(schema.QUESTIONS)].rename(columns=schema.QUESTIONS))
 
 # =====================================================
 # 1️⃣ Box Plot – Academic Performance vs Insufficient Sleep Impact
 # =====================================================
 st.subheader("📦 Academic Performance by Impact of Insufficient Sleep on Assignments")
 
-# Map academic performance to numeric if needed
-if '15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric' not in df.columns:
-    academic_performance_mapping = {
-        'Poor': 1, 'Below Average': 2, 'Average': 3, 'Good': 4, 'Excellent': 5
-    }
-    df['15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric'] = df[
-        '15. How would you rate your overall academic performance (GPA or grades) in the past semester?'
-    ].map(academic_performance_mapping)
-
-# Define order for x-axis
-impact_order = ['No impact', 'Minor impact', 'Moderate impact', 'Major impact', 'Severe impact']
-
-fig1 = px.box(
-    df,
-    x='10. How would you describe the impact of insufficient sleep on your ability to complete assignments and meet deadlines?',
-    y='15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric',
-    color='10. How would you describe the impact of insufficient sleep on your ability to complete assignments and meet deadlines?',
-    category_orders={'10. How would you describe the impact of insufficient sleep on your ability to complete assignments and meet deadlines?': impact_order},
-    color_discrete_sequence=px.colors.sequential.Sunset,
-    title='Academic Performance by Impact of Insufficient Sleep on Assignments'
-)
-fig1.update_layout(
-    xaxis_title='Impact of Insufficient Sleep on Assignments',
-    yaxis_title='Academic Performance (Numeric GPA/Grades)',
-    xaxis_tickangle=45
-)
-st.plotly_chart(fig1, use_container_width=True)
+for panel in filters.compare_panels(cube, st.session_state):
+    # Performance is scored 1 = Poor ... 5 = Excellent. Quartiles/whiskers come from
+    # the cube (in impact order), so the chart payload does not grow with the rows.
+    performance_scores = schema.score_table('performance')
+    impact = analytics.performance_by_sleep_impact(panel)
+
+    def build_impact_figure():
+        import plotly.express as px
+
+        fig = charts.box_from_stats(
+            impact['stats'],
+            title='Academic Performance by Impact of Insufficient Sleep on Assignments',
+            colors=px.colors.sequential.Sunset,
+            legend_title=schema.LABELS['sleep_impact'],
+            counts=impact['counts'],
+            values=performance_scores
+        )
+        fig.update_layout(
+            xaxis_title='Impact of Insufficient Sleep on Assignments',
+            yaxis_title='Academic Performance (Numeric GPA/Grades)',
+            xaxis_tickangle=45
+        )
+        return fig
+
+    fig1 = figure_cache.get_figure('performance_by_sleep_impact', (impact['stats'], impact['counts']), build_impact_figure)
+    with profiling.span("send.performance_by_sleep_impact"):
+        st.plotly_chart(fig1, use_container_width=True)
 
 # =====================================================
 # 2️⃣ Heatmap – Concentration Difficulty vs Fatigue vs Academic Performance
 # =====================================================
-st.subheader("🔥 Average Academic Performance by Fatigue and Concentration Difficulty")
-
-# Mapping categorical responses to numeric
-concentration_mapping = {'Never': 0, 'Rarely': 1, 'Sometimes': 2, 'Often': 3, 'Always': 4}
-fatigue_mapping = {'Never': 0, 'Rarely': 1, 'Sometimes': 2, 'Often': 3, 'Always': 4}
-
-df['7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?_numeric'] = df[
-    '7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?'
-].map(concentration_mapping)
-df['8. How often do you feel fatigued during the day, affecting your ability to study or attend classes?_numeric'] = df[
-    '8. How often do you feel fatigued during the day, affecting your ability to study or attend classes?'
-].map(fatigue_mapping)
-
-# Ensure academic performance numeric exists
-if '15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric' not in df.columns:
-    academic_performance_mapping = {
-        'Poor': 1, 'Below Average': 2, 'Average': 3, 'Good': 4, 'Excellent': 5
-    }
-    df['15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric'] = df[
-        '15. How would you rate your overall academic performance (GPA or grades) in the past semester?'
-    ].map(academic_performance_mapping)
-
-# Create pivot table
-heatmap_data = df.pivot_table(
-    index='7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?_numeric',
-    columns='8. How often do you feel fatigued during the day, affecting your ability to study or attend classes?_numeric',
-    values='15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric',
-    aggfunc='mean'
+# Below the fold: computed and drawn only once the section is opened
+performance_heatmap_section = st.expander(
+    "🔥 Average Academic Performance by Fatigue and Concentration Difficulty",
+    key="performance_heatmap_section",
+    on_change="rerun"
 )
+if performance_heatmap_section.open:
+    with performance_heatmap_section:
+        for panel in filters.compare_panels(cube, st.session_state):
+            # Mean performance per cell, labelled on the numeric scale (0 = Never ... 4 = Always)
+            heatmap_data = analytics.performance_heatmap(panel)
 
-# Create interactive heatmap
-fig2 = px.imshow(
-    heatmap_data,
-    text_auto=True,
-    color_continuous_scale='Sunset',
-    title='Average Academic Performance by Fatigue and Concentration Difficulty'
-)
-fig2.update_layout(
-    xaxis_title='Fatigue Frequency (Numeric Scale)',
-    yaxis_title='Concentration Difficulty (Numeric Scale)'
-)
-st.plotly_chart(fig2, use_container_width=True)
+            def build_performance_heatmap_figure():
+                import plotly.express as px
+
+                # Create interactive heatmap
+                fig = px.imshow(
+                    heatmap_data,
+                    text_auto=True,
+                    color_continuous_scale='Sunset',
+                    title='Average Academic Performance by Fatigue and Concentration Difficulty'
+                )
+                fig.update_layout(
+                    xaxis_title='Fatigue Frequency (Numeric Scale)',
+                    yaxis_title='Concentration Difficulty (Numeric Scale)'
+                )
+                return fig
+
+            fig2 = figure_cache.get_figure('performance_heatmap', heatmap_data, build_performance_heatmap_figure)
+            with profiling.span("send.performance_heatmap"):
+                st.plotly_chart(fig2, use_container_width=True)
 
 # =====================================================
 # 3️⃣ Violin Plot – Academic Performance by Difficulty Concentrating
 # =====================================================
-st.subheader("🎻 Distribution of Academic Performance by Difficulty Concentrating")
-
-fig3 = px.violin(
-    df,
-    x='7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?',
-    y='15. How would you rate your overall academic performance (GPA or grades) in the past semester?_numeric',
-    color='7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?',
-    box=True,
-    points='all',
-    category_orders={'7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?': ['Never', 'Rarely', 'Sometimes', 'Often', 'Always']},
-    color_discrete_sequence=px.colors.sequential.Sunset,
-    title='Distribution of Academic Performance by Difficulty Concentrating Frequency'
+# Below the fold: computed and drawn only once the section is opened
+performance_by_concentration_section = st.expander(
+    "🎻 Distribution of Academic Performance by Difficulty Concentrating",
+    key="performance_by_concentration_section",
+    on_change="rerun"
 )
-fig3.update_layout(
-    xaxis_title='Difficulty Concentrating Frequency',
-    yaxis_title='Academic Performance (Numeric GPA/Grades)',
-    xaxis_tickangle=45
+if performance_by_concentration_section.open:
+    with performance_by_concentration_section:
+        for panel in filters.compare_panels(cube, st.session_state):
+            # KDE curves, quartiles and a bounded point sample replace shipping every response
+            concentration = analytics.performance_by_concentration(panel)
+
+            def build_concentration_figure():
+                import plotly.express as px
+
+                fig = charts.violin_from_aggregates(
+                    concentration['stats'],
+                    kde=concentration['kde'],
+                    samples=charts.sample_points(concentration['counts'], performance_scores),
+                    title='Distribution of Academic Performance by Difficulty Concentrating Frequency',
+                    colors=px.colors.sequential.Sunset,
+                    legend_title=schema.LABELS['concentration']
+                )
+                fig.update_layout(
+                    xaxis_title='Difficulty Concentrating Frequency',
+                    yaxis_title='Academic Performance (Numeric GPA/Grades)',
+                    xaxis_tickangle=45
+                )
+                return fig
+
+            fig3 = figure_cache.get_figure(
+                'performance_by_concentration',
+                (concentration['stats'], concentration['counts']),
+                build_concentration_figure
+            )
+            with profiling.span("send.performance_by_concentration"):
+                st.plotly_chart(fig3, use_container_width=True)
+
+# =====================================================
+# 4️⃣ Drill-Down – Academic Performance by Up to Four Factors
+# =====================================================
+# Below the fold: computed and drawn only once the section is opened
+performance_drilldown_section = st.expander(
+    "🔬 Drill Down: Academic Performance by Any Combination of Factors",
+    key="performance_drilldown_section",
+    on_change="rerun"
 )
-st.plotly_chart(fig3, use_container_width=True)
+if performance_drilldown_section.open:
+    with performance_drilldown_section:
+        drilldown_col, min_col = st.columns([3, 1])
+        drilldown_dims = drilldown_col.multiselect(
+            "Group by",
+            analytics.DRILL_DOWN_DIMS,
+            default=analytics.DEFAULT_DRILL_DOWN,
+            max_selections=analytics.MAX_DRILL_DOWN_DIMS,
+            format_func=schema.LABELS.get,
+            key="performance_drilldown_dims"
+        )
+        min_responses = min_col.number_input(
+            "Minimum responses per group", min_value=1, value=5, key="performance_drilldown_min"
+        )
+
+        if not drilldown_dims:
+            st.info("Choose at least one factor to group by.")
+        elif is_streaming() and len(drilldown_dims) > 1:
+            # only the 1-D/2-D tables are folded from the chunks
+            st.info("🌊 Streaming mode can drill down by one factor at a time.")
+        else:
+            for panel in filters.compare_panels(cube, st.session_state):
+                # Count, mean and 95% CI of every group from one table over the chosen
+                # factors plus performance (1 = Poor ... 5 = Excellent), best groups first
+                drilldown = analytics.performance_drilldown(panel, drilldown_dims)
+                drilldown = drilldown[drilldown['n'] >= min_responses].sort_values('mean', ascending=False)
+
+                def build_drilldown_figure():
+                    import plotly.express as px
+
+                    return charts.mean_ci_from_stats(
+                        drilldown,
+                        by=drilldown_dims,
+                        title='Mean Academic Performance (95% CI) by ' + ' × '.join(
+                            schema.LABELS[dim] for dim in drilldown_dims
+                        ),
+                        color=px.colors.sequential.Sunset[3],
+                        x_title='Academic Performance (Numeric GPA/Grades)'
+                    )
+
+                if drilldown.empty:
+                    st.info(f"No group has at least {min_responses} responses.")
+                    continue
+                if len(drilldown) > charts.MAX_GROUPS:
+                    st.caption(f"Chart shows the {charts.MAX_GROUPS} highest of {len(drilldown):,} groups; the table lists all.")
+                fig4 = figure_cache.get_figure('performance_drilldown', drilldown, build_drilldown_figure)
+                with profiling.span("send.performance_drilldown"):
+                    st.plotly_chart(fig4, use_container_width=True)
+                st.dataframe(
+                    drilldown.rename(columns={
+                        **schema.LABELS, 'n': 'Responses', 'mean': 'Mean performance', 'std': 'Std. dev.',
+                        'ci_low': '95% CI low', 'ci_high': '95% CI high'
+                    }),
+                    hide_index=True
+                )
 
 # --- Footer ---
 st.markdown("---")
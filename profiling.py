@@ -0,0 +1,170 @@
+"""Opt-in timing instrumentation for dashboard reruns.
+
+Profiling is off unless ``SURVEY_PROFILE=1`` is set or the page is opened
+with ``?profile=1``. When it is on, ``app.py`` starts a profiler for each
+rerun, and every ``span()`` opened on that thread (loading, preparation,
+analytics, figure builds, chart sends) records its wall time and the change
+in traced Python memory. ``finish()`` shows the spans in a collapsible panel
+and, when ``SURVEY_PROFILE_FILE`` names a file, appends them to it as JSON
+lines for offline analysis.
+
+When profiling is off, ``span()`` only checks a thread-local and returns,
+and ``tracemalloc`` runs only while at least one rerun is being profiled.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+ENV_FLAG = "SURVEY_PROFILE"
+ENV_FILE = "SURVEY_PROFILE_FILE"
+QUERY_PARAM = "profile"
+
+_local = threading.local()
+_export_lock = threading.Lock()
+# reruns being profiled right now; memory tracing is stopped when none are
+_active = 0
+_active_lock = threading.Lock()
+
+
+class Profiler:
+    """Spans recorded during one rerun, in the order they were opened."""
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self.spans = []
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        record = {"name": name, "depth": self._depth, "start_ms": (time.perf_counter() - self._origin) * 1000}
+        self.spans.append(record)
+        memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            record["duration_ms"] = (time.perf_counter() - start) * 1000
+            record["memory_delta_bytes"] = tracemalloc.get_traced_memory()[0] - memory
+
+    def total_ms(self):
+        return (time.perf_counter() - self._origin) * 1000
+
+
+def enabled():
+    """True when profiling was requested by environment variable or query parameter."""
+    if os.environ.get(ENV_FLAG, "0") not in ("", "0"):
+        return True
+    try:
+        import streamlit as st
+
+        return st.query_params.get(QUERY_PARAM, "0") not in ("", "0", "false")
+    except Exception:
+        return False
+
+
+def start():
+    """Begin profiling this rerun if enabled; returns the profiler or None."""
+    global _active
+    _stop(current())
+    profiler = Profiler() if enabled() else None
+    if profiler is not None:
+        with _active_lock:
+            _active += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+    _local.profiler = profiler
+    return profiler
+
+
+def _stop(profiler):
+    global _active
+    _local.profiler = None
+    if profiler is None:
+        return
+    with _active_lock:
+        _active -= 1
+        if _active == 0:
+            tracemalloc.stop()
+
+
+def stop():
+    """Stop profiling this rerun without showing or exporting anything."""
+    _stop(current())
+
+
+def current():
+    """Profiler of the rerun running on this thread (None when profiling is off)."""
+    return getattr(_local, "profiler", None)
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as ``name`` when this rerun is being profiled."""
+    profiler = current()
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name):
+        yield
+
+
+def profiled(stage):
+    """Decorator timing every call as a ``<stage>.<function name>`` span."""
+    def decorate(fn):
+        name = f"{stage}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def finish(page=None):
+    """Show the timing panel and export the spans of this rerun, then stop profiling."""
+    profiler = current()
+    if profiler is None:
+        return
+    total = profiler.total_ms()
+    _stop(profiler)
+    path = os.environ.get(ENV_FILE)
+    if path:
+        export(profiler, path, page)
+    render(profiler, total)
+
+
+def render(profiler, total_ms):
+    """Collapsible panel listing each span with its time and memory change."""
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander(f"⏱️ Rerun timings ({total_ms:,.0f} ms)"):
+        st.dataframe(
+            pd.DataFrame({
+                "Stage": [" " * s["depth"] + s["name"] for s in profiler.spans],
+                "Start (ms)": [s["start_ms"] for s in profiler.spans],
+                "Time (ms)": [s.get("duration_ms") for s in profiler.spans],
+                "Memory Δ (KiB)": [s.get("memory_delta_bytes", 0) / 1024 for s in profiler.spans],
+            }).round(2),
+            hide_index=True,
+        )
+
+
+def export(profiler, path, page=None):
+    """Append the spans as JSON lines (one per span) to ``path``."""
+    lines = [
+        json.dumps({"run_id": profiler.run_id, "time": profiler.started, "page": page, **record})
+        for record in profiler.spans
+    ]
+    with _export_lock, open(path, "a") as f:
+        f.write("".join(line + "\n" for line in lines))
@@ -0,0 +1,103 @@
+"""Scheduled background refresh of the survey data (stale-while-revalidate).
+
+Set ``SURVEY_REFRESH_SECONDS`` (or call ``start(interval)``) to hand
+reloading to a background scheduler. Every ``interval`` seconds it checks
+the data source; when the contents changed, it loads the new version (only
+the appended rows when that is all that changed), prepares it and
+precomputes every page's aggregates (``warmup.warm``) on its own thread,
+then swaps the new version in with one assignment (``data.staged_reload``).
+Until then every session keeps reading the previous version, and reads
+never look at the source, so no rerun waits for a refresh. A failed refresh
+is logged, leaves the previous version in place and is retried on the next
+tick.
+
+Without the variable, the data layer checks the file on every read and the
+warm-up runs after a change, as before.
+
+Only the standard library is imported here (``warmup.start`` runs it before
+anything else is loaded).
+"""
+import logging
+import os
+import threading
+import time
+
+ENV_VAR = "SURVEY_REFRESH_SECONDS"
+
+_log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {"thread": None, "stop": None, "version": None, "checked": None, "refreshed": None, "error": None}
+
+
+def interval():
+    """Configured refresh interval in seconds (None when scheduled refresh is off)."""
+    seconds = float(os.environ.get(ENV_VAR) or 0)
+    return seconds if seconds > 0 else None
+
+
+def refresh_once():
+    """Check the source once; warm and publish a new version. True if one was swapped in."""
+    import data
+    import warmup
+
+    with data.staged_reload() as version:
+        if version is None:
+            return False
+        warmup.warm(version)
+    with _lock:
+        _state.update(version=version, refreshed=time.time())
+    return True
+
+
+def _run(seconds, stop):
+    import data
+
+    data.set_scheduled(True)
+    try:
+        while True:
+            try:
+                refresh_once()
+                error = None
+            except Exception as exc:  # keep serving the previous version
+                _log.exception("Scheduled refresh failed; serving the previous version")
+                error = repr(exc)
+            with _lock:
+                _state.update(checked=time.time(), error=error)
+            if stop.wait(seconds):
+                break
+    finally:
+        data.set_scheduled(False)
+
+
+def start(seconds=None):
+    """Start the scheduler thread unless it is already running; returns it."""
+    seconds = seconds or interval()
+    if not seconds:
+        raise ValueError(f"No refresh interval given; set {ENV_VAR} or pass seconds")
+    with _lock:
+        thread = _state["thread"]
+        if thread is not None and thread.is_alive():
+            return thread
+        stop = _state["stop"] = threading.Event()
+        thread = _state["thread"] = threading.Thread(
+            target=_run, args=(seconds, stop), name="survey-refresh", daemon=True
+        )
+    thread.start()
+    return thread
+
+
+def stop():
+    """Stop the scheduler; reads check the source themselves again."""
+    with _lock:
+        thread, event = _state["thread"], _state["stop"]
+    if event is not None:
+        event.set()
+    if thread is not None:
+        thread.join()
+
+
+def status():
+    """Published version and the times (epoch seconds) of the last check and swap."""
+    with _lock:
+        return {key: value for key, value in _state.items() if key not in ("thread", "stop")}
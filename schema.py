@@ -0,0 +1,163 @@
+"""Categorical schema for the 15 survey questions.
+
+Every question is parsed straight into a ``pd.Categorical`` with its answer
+levels in their natural order, and renamed to a short alias. Pages therefore
+work on compact int8 category codes instead of long answer strings, and the
+level order used by charts, codes and numeric scores all comes from here.
+
+pandas is imported on first use (``DTYPES`` or reading a CSV), so the
+sidebar can be drawn from the plain level lists before it is loaded.
+"""
+import numpy as np
+
+# --- Question text, keyed by short alias ---
+# NOTE: question 3 really does end with a trailing space in the CSV header.
+QUESTIONS = {
+    "year": "1. What is your year of study?",
+    "gender": "2. What is your gender?",
+    "sleep_difficulty": "3. How often do you have difficulty falling asleep at night? ",
+    "sleep_hours": "4. On average, how many hours of sleep do you get on a typical day?",
+    "night_waking": "5. How often do you wake up during the night and have trouble falling back asleep?",
+    "sleep_quality": "6. How would you rate the overall quality of your sleep?",
+    "concentration": "7. How often do you experience difficulty concentrating during lectures or studying due to lack of sleep?",
+    "fatigue": "8. How often do you feel fatigued during the day, affecting your ability to study or attend classes?",
+    "missed_classes": "9. How often do you miss or skip classes due to sleep-related issues (e.g., insomnia, feeling tired)?",
+    "sleep_impact": "10. How would you describe the impact of insufficient sleep on your ability to complete assignments and meet deadlines?",
+    "device_use": "11. How often do you use electronic devices (e.g., phone, computer) before going to sleep?",
+    "caffeine": "12. How often do you consume caffeine (coffee, energy drinks) to stay awake or alert?",
+    "exercise": "13. How often do you engage in physical activity or exercise?",
+    "stress": "14. How would you describe your stress levels related to academic workload?",
+    "performance": "15. How would you rate your overall academic performance (GPA or grades) in the past semester?",
+}
+ALIASES = {question: alias for alias, question in QUESTIONS.items()}
+
+# --- Short display labels for axes and legends ---
+LABELS = {
+    "year": "Year of Study",
+    "gender": "Gender",
+    "sleep_difficulty": "Difficulty falling asleep",
+    "sleep_hours": "Average hours of sleep",
+    "night_waking": "Nighttime awakenings",
+    "sleep_quality": "Sleep Quality",
+    "concentration": "Difficulty concentrating",
+    "fatigue": "Daytime fatigue",
+    "missed_classes": "Missed classes",
+    "sleep_impact": "Impact on assignments",
+    "device_use": "Electronic device use before sleep",
+    "caffeine": "Caffeine consumption",
+    "exercise": "Physical activity",
+    "stress": "Stress Level",
+    "performance": "Academic performance",
+}
+
+# --- Answer levels, lowest to highest ---
+_WEEKLY = [
+    "Never",
+    "Rarely (1-2 times a week)",
+    "Sometimes (3-4 times a week)",
+    "Often (5-6 times a week)",
+]
+_FREQUENCY = ["Never", "Rarely", "Sometimes", "Often", "Always"]
+
+LEVELS = {
+    "year": ["First year", "Second year", "Third year", "Graduate student"],
+    "gender": ["Female", "Male"],
+    "sleep_difficulty": _WEEKLY + ["Every night"],
+    "sleep_hours": ["Less than 4 hours", "4-5 hours", "5-6 hours", "6-7 hours", "7-8 hours", "More than 8 hours"],
+    "night_waking": _WEEKLY + ["Every night"],
+    "sleep_quality": ["Very poor", "Poor", "Average", "Good", "Very good"],
+    "concentration": _FREQUENCY,
+    "fatigue": _FREQUENCY,
+    "missed_classes": [
+        "Never",
+        "Rarely (1-2 times a month)",
+        "Sometimes (1-2 times a week)",
+        "Often (3-4 times a week)",
+        "Always",
+    ],
+    "sleep_impact": ["No impact", "Minor impact", "Moderate impact", "Major impact", "Severe impact"],
+    "device_use": _WEEKLY + ["Every night"],
+    "caffeine": _WEEKLY + ["Every day"],
+    "exercise": _WEEKLY + ["Every day"],
+    "stress": ["No stress", "Low stress", "High stress", "Extremely high stress"],
+    "performance": ["Poor", "Below Average", "Average", "Good", "Excellent"],
+}
+
+# Gender has no natural order; year and gender describe the respondent and
+# the remaining 13 questions are ordinal ratings
+NOMINAL = ["gender"]
+ORDINAL = [alias for alias in QUESTIONS if alias not in NOMINAL and alias != "year"]
+
+_dtypes = None
+
+
+def _categorical_dtypes():
+    global _dtypes
+    if _dtypes is None:
+        import pandas as pd
+
+        _dtypes = {
+            alias: pd.CategoricalDtype(levels, ordered=alias not in NOMINAL)
+            for alias, levels in LEVELS.items()
+        }
+    return _dtypes
+
+
+def __getattr__(name):
+    # DTYPES is built on first access, so importing schema does not import pandas
+    if name == "DTYPES":
+        return _categorical_dtypes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- Numeric scores per level (defaults to the ordinal code) ---
+SCORES = {
+    # midpoint of each reported range, in hours
+    "sleep_hours": [3, 4.5, 5.5, 6.5, 7.5, 9],
+    # nights per week
+    "device_use": [0, 1.5, 3.5, 5.5, 7],
+    # 1 = Poor ... 5 = Excellent
+    "performance": [1, 2, 3, 4, 5],
+}
+
+
+def read_csv(source, **kwargs):
+    """Read a survey CSV straight into the categorical schema.
+
+    Answers are parsed directly into their categorical dtype (no intermediate
+    ``object`` columns) and the columns are renamed to their aliases. Answers
+    that are not one of the known levels become missing values.
+    """
+    import pandas as pd
+
+    dtype = {QUESTIONS[alias]: dtype for alias, dtype in _categorical_dtypes().items()}
+    df = pd.read_csv(source, dtype=dtype, **kwargs)
+    return df.rename(columns=ALIASES)
+
+
+def read_csv_chunks(source, chunksize, **kwargs):
+    """Like ``read_csv`` but yields frames of at most ``chunksize`` rows."""
+    import pandas as pd
+
+    dtype = {QUESTIONS[alias]: dtype for alias, dtype in _categorical_dtypes().items()}
+    with pd.read_csv(source, dtype=dtype, chunksize=chunksize, **kwargs) as reader:
+        for chunk in reader:
+            yield chunk.rename(columns=ALIASES)
+
+
+def codes(df, alias):
+    """Ordinal codes (int8, -1 for missing) of a categorical column."""
+    return df[alias].cat.codes
+
+
+def score_table(alias):
+    """Numeric score for each level of ``alias``, indexed by ordinal code."""
+    return np.asarray(SCORES.get(alias, range(len(LEVELS[alias]))), dtype="float64")
+
+
+def scores(df, alias):
+    """Numeric scores of a categorical column, NaN for missing answers."""
+    import pandas as pd
+
+    table = np.append(score_table(alias), np.nan)
+    # code -1 (missing) picks the trailing NaN
+    return pd.Series(table[df[alias].cat.codes.to_numpy()], index=df.index, name=alias)
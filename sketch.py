@@ -0,0 +1,99 @@
+"""Constant-size summaries behind the metric cards (sketch mode).
+
+A ``MetricSketch`` keeps, for each survey question, the number of responses
+per answer level, and for each numeric measure its streaming moments (count,
+mean and sum of squared deviations). That is everything the metric cards
+read: modes, means and their error bounds come out of it in time and memory
+independent of the number of responses.
+
+The per-level counters are a count-min / heavy-hitter summary with a single
+exact row: no question has more than six answer levels, so hashing them into
+a narrower table could only add collision error. What remains uncertain is
+sampling error, and the bound each card shows is the 95% interval (normal
+approximation) of the mean or of the modal answer's share.
+
+Sketches are read off a cube's 1-D tables, which are already updated per
+ingested batch (chunks, appended rows) and merged across chunks and warm-up
+workers, so a sketch never needs merging itself; quantiles of the answers
+come from the same tables (``Cube.box_stats``). Sketch mode is opt-in: set
+``SURVEY_SKETCH_METRICS=1``.
+"""
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+import schema
+
+ENV_FLAG = "SURVEY_SKETCH_METRICS"
+# two-sided 95% normal quantile
+Z_95 = NormalDist().inv_cdf(0.975)
+
+
+def enabled():
+    """True when the metric cards should be served from sketches."""
+    return os.environ.get(ENV_FLAG, "0") not in ("", "0")
+
+
+class MetricSketch:
+    """Level counters per question plus moments per ``<alias>_numeric`` measure."""
+
+    def __init__(self, levels, counts, moments):
+        self._levels = dict(levels)
+        # dim -> int64 counts per level; measure -> (n, mean, sum of squared deviations)
+        self._counts = dict(counts)
+        self._moments = dict(moments)
+
+    @classmethod
+    def of(cls, cube, dims=None, measures=None):
+        """Sketch of the rows behind ``cube``, from its 1-D count tables.
+
+        Each measure is the numeric score of one question, so its moments
+        follow exactly from that question's level counts.
+        """
+        dims = [dim for dim in (dims or schema.QUESTIONS) if dim in cube.dims]
+        measures = cube.measures if measures is None else measures
+        tables = {dim: cube.counts(dim) for dim in dims}
+        counts = {dim: table.to_numpy(dtype="int64") for dim, table in tables.items()}
+        moments = {}
+        for measure in measures:
+            alias = measure.removesuffix("_numeric")
+            level_counts = counts[alias] if alias in counts else cube.counts(alias).to_numpy(dtype="int64")
+            moments[measure] = _moments(level_counts, schema.score_table(alias))
+        return cls({dim: list(table.index) for dim, table in tables.items()}, counts, moments)
+
+    # --- Reads (cube-compatible where the cards need it) ---
+    def mode(self, dim):
+        """Most common level of ``dim`` (None when there are no answers)."""
+        counts = self._counts[dim]
+        if not counts.any():
+            return None
+        return self._levels[dim][int(counts.argmax())]
+
+    def mean(self, measure):
+        """Mean of ``measure`` (NaN when empty)."""
+        return self._moments[measure][1]
+
+    def mode_share(self, dim):
+        """Share of answers at the mode and its 95% half-width (NaN when empty)."""
+        counts = self._counts[dim]
+        n = counts.sum()
+        if not n:
+            return float("nan"), float("nan")
+        share = counts.max() / n
+        return float(share), float(Z_95 * np.sqrt(share * (1 - share) / n))
+
+    def mean_bound(self, measure):
+        """95% half-width of the mean of ``measure`` (NaN with fewer than two answers)."""
+        n, _, m2 = self._moments[measure]
+        if n < 2:
+            return float("nan")
+        return float(Z_95 * np.sqrt(m2 / (n - 1) / n))
+
+
+def _moments(counts, scores):
+    n = int(counts.sum())
+    if not n:
+        return 0, float("nan"), 0.0
+    mean = float(counts @ scores / n)
+    return n, mean, float(counts @ (scores - mean) ** 2)
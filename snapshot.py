@@ -0,0 +1,344 @@
+"""Static snapshot of the dashboard: every page pre-rendered to HTML.
+
+    python snapshot.py --output-dir site
+    python -m http.server --directory site       # or any static file server
+
+Each page is rendered headlessly (``AppTest``) with the sidebar at its
+defaults (all responses) and every on-demand section open, and written as
+plain HTML: headings, text, metric cards, the dataset preview and the
+collapsible sections. Every Plotly figure is stored as its own JSON file
+under ``figures/`` (named by a hash of its content) and drawn in the browser
+by the bundled ``plotly.min.js``, so serving the bundle runs no Python.
+
+Rebuilds are incremental. ``manifest.json`` records a key per page over the
+dataset's content hash and the dashboard's source code, and a key per
+figure over its figure cache key (chart name plus fingerprint of its
+aggregates), the source code and the Plotly version.
+A page whose key is unchanged is not rendered again; a page that is
+re-rendered rebuilds only the figures whose aggregates changed and loads
+the others from the previous bundle (see ``figure_cache.set_store``). Files
+are replaced atomically and only when their content changes, and figures
+no page references any more are removed.
+"""
+import argparse
+import glob
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+
+import analytics
+import data
+import figure_cache
+import sketch
+import waves
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# page script -> (navigation title, output file); the first page is the home page
+PAGES = {
+    "page1_objective1.py": ("Objective 1 – Sleep Distribution", "index.html"),
+    "page2_objective2.py": ("Objective 2 – Lifestyle Impact", "objective-2.html"),
+    "page3_objective3.py": ("Objective 3 – Academic Performance", "objective-3.html"),
+}
+FIGURE_DIR = "figures"
+PLOTLY_JS = "plotly.min.js"
+MANIFEST = "manifest.json"
+# Widgets are shown as their (default) value; changing them needs the live app
+CONTROLS = {"radio", "toggle", "checkbox", "selectbox", "multiselect", "slider", "select_slider", "number_input"}
+
+STYLE = """
+body { font-family: "Source Sans Pro", sans-serif; margin: 0; color: #31333f; }
+nav { background: #f0f2f6; padding: 0.75rem 2rem; }
+nav a { margin-right: 1.5rem; color: #31333f; text-decoration: none; }
+nav a.current { font-weight: 600; }
+main { padding: 1rem 2rem 3rem; }
+.row { display: flex; gap: 1rem; flex-wrap: wrap; margin: 1rem 0; }
+.col { min-width: 0; }
+.metric { border: 1px solid #d6d6d9; border-radius: 0.5rem; padding: 0.75rem 1rem; }
+.metric .label { font-size: 0.875rem; }
+.metric .value { font-size: 1.75rem; }
+.metric .delta { font-size: 0.875rem; color: #808495; }
+footer { padding: 0 2rem 2rem; }
+.caption, .control, footer { font-size: 0.875rem; color: #808495; }
+details { border: 1px solid #d6d6d9; border-radius: 0.5rem; padding: 0.5rem 1rem; margin: 1rem 0; }
+summary { cursor: pointer; }
+.chart { width: 100%; min-height: 450px; }
+table.dataframe { border-collapse: collapse; font-size: 0.8rem; }
+table.dataframe td, table.dataframe th { border: 1px solid #e6e6e9; padding: 0.25rem 0.5rem; }
+"""
+
+# Figures are fetched when visible: on load, or when their section is opened
+SCRIPT = """
+function draw(el) {
+  if (el.dataset.drawn) return;
+  el.dataset.drawn = "1";
+  fetch(el.dataset.src).then(r => r.json()).then(fig =>
+    Plotly.newPlot(el, fig.data, fig.layout, {responsive: true, displaylogo: false}));
+}
+document.querySelectorAll(".chart").forEach(el => {
+  if (!el.closest("details:not([open])")) draw(el);
+});
+document.querySelectorAll("details").forEach(section => section.addEventListener("toggle", () => {
+  if (section.open) section.querySelectorAll(".chart").forEach(draw);
+}));
+"""
+
+
+# --- Files ---
+def _write(path, content):
+    """Atomically write ``content`` (bytes) to ``path`` unless it already holds it."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path + ".tmp", "wb") as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+    return True
+
+
+def _write_figure(output_dir, spec):
+    """Bundle path of the figure JSON ``spec``, writing it if it is new."""
+    # named by content regardless of key order, which a reloaded figure may change
+    canonical = json.dumps(json.loads(spec), sort_keys=True)
+    name = f"{FIGURE_DIR}/{hashlib.sha1(canonical.encode()).hexdigest()[:20]}.json"
+    path = os.path.join(output_dir, name)
+    if not os.path.exists(path):
+        _write(path, spec.encode())
+    return name
+
+
+def source_hash():
+    """Digest of the dashboard's source code (every module next to this one)."""
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(HERE, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def code_key():
+    """Changes with the code that builds figures: this dashboard and Plotly."""
+    import plotly
+
+    return hashlib.sha1(f"{source_hash()}/{plotly.__version__}".encode()).hexdigest()
+
+
+def page_key(page):
+    """Changes whenever anything a page renders may have changed."""
+    key = [page, data.dataset_version(), code_key(), sketch.enabled(), waves.registered()]
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+class FigureStore:
+    """Figures of the previous build by figure cache key (see ``figure_cache.set_store``)."""
+
+    def __init__(self, output_dir, files, code):
+        self.output_dir = output_dir
+        # figures built by other code (see ``code_key``) are never reused
+        self.code = code
+        # figure cache key -> bundle path, from the previous build
+        self.files = dict(files)
+        # ... and those requested while rendering the current page
+        self.used = {}
+        self.built = self.reused = 0
+
+    def _id(self, key):
+        return "/".join(map(str, [self.code, *key]))
+
+    def load(self, key):
+        name = self.files.get(self._id(key))
+        if name is None or not os.path.exists(os.path.join(self.output_dir, name)):
+            return None
+        import plotly.io as pio
+
+        with open(os.path.join(self.output_dir, name)) as f:
+            figure = pio.from_json(f.read(), skip_invalid=True)
+        self.used[self._id(key)] = name
+        self.reused += 1
+        return figure
+
+    def save(self, key, figure):
+        if self._id(key) not in self.used:
+            self.used[self._id(key)] = _write_figure(self.output_dir, figure.to_json(validate=False))
+            self.built += 1
+
+
+# --- Rendering ---
+def _inline(text):
+    """The inline Markdown the pages use (bold, italics) as HTML."""
+    text = html.escape(text.strip())
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    return re.sub(r"\*(.+?)\*", r"<em>\1</em>", text)
+
+
+def _markdown(text):
+    if text.strip() == "---":
+        return "<hr>"
+    return "\n".join(f"<p>{_inline(part)}</p>" for part in re.split(r"\n\s*\n", text.strip()) if part.strip())
+
+
+def _render(node, output_dir, figures):
+    """HTML of an ``AppTest`` element tree node; figure files are added to ``figures``."""
+    kind = node.type
+    children = "\n".join(_render(child, output_dir, figures) for child in getattr(node, "children", {}).values())
+    if kind == "main":
+        return children
+    if kind == "flex_container":
+        return f'<div class="row">\n{children}\n</div>'
+    if kind == "column":
+        return f'<div class="col" style="flex: {node.proto.weight:g}">\n{children}\n</div>'
+    if kind == "expander":
+        label = _inline(node.proto.label)
+        return f"<details>\n<summary>{label}</summary>\n{children}\n</details>"
+    if kind in ("title", "header", "subheader"):
+        return f"<{node.proto.tag}>{_inline(node.proto.body)}</{node.proto.tag}>"
+    if kind == "markdown":
+        return _markdown(node.proto.body)
+    if kind == "caption":
+        return f'<p class="caption">{_inline(node.proto.body)}</p>'
+    if kind == "metric":
+        proto = node.proto
+        delta = f'\n<div class="delta">{html.escape(proto.delta)}</div>' if proto.delta else ""
+        return (
+            f'<div class="metric" title="{html.escape(proto.help)}">\n'
+            f'<div class="label">{html.escape(proto.label)}</div>\n'
+            f'<div class="value">{html.escape(proto.body)}</div>{delta}\n</div>'
+        )
+    if kind == "plotly_chart":
+        name = _write_figure(output_dir, node.proto.spec)
+        figures.append(name)
+        return f'<div class="chart" data-src="{name}"></div>'
+    if kind == "dataframe":
+        return node.value.to_html(border=0)
+    if kind in CONTROLS:
+        value = ("on" if node.value else "off") if isinstance(node.value, bool) else node.value
+        return f'<p class="control">{html.escape(node.label)}: <strong>{html.escape(str(value))}</strong></p>'
+    return children
+
+
+def _document(page, body, built):
+    title, _ = PAGES[page]
+    current = ' class="current"'
+    links = "\n".join(
+        f'<a href="{filename}"{current if script == page else ""}>{html.escape(name)}</a>'
+        for script, (name, filename) in PAGES.items()
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)}</title>
+<style>{STYLE}</style>
+<script src="{PLOTLY_JS}"></script>
+</head>
+<body>
+<nav>
+{links}
+</nav>
+<main>
+{body}
+</main>
+<footer>
+Static snapshot of all {data.load_cube().n_rows:,} responses, built {built}.
+Filters and chart options are available in the live dashboard.
+</footer>
+<script>{SCRIPT}</script>
+</body>
+</html>
+"""
+
+
+def render_page(page, output_dir, store):
+    """Render ``page`` headlessly; returns its HTML and the figure files it shows."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(HERE, page), default_timeout=600)
+    for key in analytics.SECTIONS:
+        app.session_state[key] = True
+    for n in range(1, len(PAGES) + 1):
+        app.session_state[f"dataset_preview_{n}"] = True
+    # every figure request goes through the store, not this process's cache
+    figure_cache.clear()
+    store.used = {}
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{page} failed: {app.exception[0].message}")
+    figures = []
+    body = _render(app.main, output_dir, figures)
+    return _document(page, body, time.strftime("%Y-%m-%d %H:%M %Z")), figures
+
+
+# --- Build ---
+def build(output_dir, force=False):
+    """Render every changed page into ``output_dir``; returns the manifest."""
+    from plotly.offline import get_plotlyjs
+
+    os.makedirs(os.path.join(output_dir, FIGURE_DIR), exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)["pages"]
+    except (FileNotFoundError, KeyError, ValueError):
+        previous = {}
+
+    _write(os.path.join(output_dir, PLOTLY_JS), get_plotlyjs().encode())
+    store = FigureStore(output_dir, {
+        key: name for entry in previous.values() for key, name in entry.get("inputs", {}).items()
+    }, code_key())
+    pages, rendered = {}, []
+    figure_cache.set_store(store)
+    try:
+        for page, (_, filename) in PAGES.items():
+            key = page_key(page)
+            entry = previous.get(page)
+            if not force and entry and entry["key"] == key and os.path.exists(os.path.join(output_dir, filename)):
+                pages[page] = entry
+                continue
+            document, figures = render_page(page, output_dir, store)
+            _write(os.path.join(output_dir, filename), document.encode())
+            pages[page] = {"key": key, "file": filename, "figures": figures, "inputs": store.used}
+            rendered.append(page)
+    finally:
+        figure_cache.set_store(None)
+
+    referenced = {name for entry in pages.values() for name in [*entry["figures"], *entry["inputs"].values()]}
+    removed = 0
+    for path in glob.glob(os.path.join(output_dir, FIGURE_DIR, "*.json")):
+        if f"{FIGURE_DIR}/{os.path.basename(path)}" not in referenced:
+            os.remove(path)
+            removed += 1
+    manifest = {
+        "dataset_version": data.dataset_version(),
+        "pages": pages,
+        "build": {"rendered": rendered, "figures_built": store.built, "figures_reused": store.reused,
+                  "figures_removed": removed},
+    }
+    _write(manifest_path, json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", default="site", help="where the static bundle is written")
+    parser.add_argument("--force", action="store_true", help="re-render every page even if unchanged")
+    args = parser.parse_args(argv)
+
+    stats = build(args.output_dir, args.force)["build"]
+    print(
+        f"Rendered {len(stats['rendered'])} of {len(PAGES)} pages "
+        f"({stats['figures_built']} figures built, {stats['figures_reused']} reused, "
+        f"{stats['figures_removed']} removed) into {args.output_dir}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
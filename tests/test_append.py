@@ -0,0 +1,191 @@
+"""Append mode and staged reloads, on a temporary copy of the bundled survey CSV."""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+import schema
+
+SELECTION = {"year": ["First year", "Second year"], "gender": ["Female"]}
+# tables compared between an appended and a freshly loaded cube
+CROSSTABS = [("stress", "year"), ("sleep_quality", "device_use"), ("concentration", "fatigue")]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """No Arrow files next to the copy, and no data cached across tests."""
+    monkeypatch.setattr(data, "COLUMNAR_CACHE", False)
+    data.clear_cache()
+    yield
+    data.set_scheduled(False)
+    data.clear_cache()
+
+
+@pytest.fixture
+def survey(tmp_path):
+    """``(path, lines)``: a CSV holding the header and the first half of the bundled rows."""
+    with open(data.DATA_FILE, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    path = str(tmp_path / "survey.csv")
+    _write(path, lines[: len(lines) // 2])
+    return path, lines
+
+
+@pytest.fixture
+def appends(monkeypatch):
+    """Results of every ``data._append`` call (True when the new rows were folded in)."""
+    results = []
+    append = data._append
+
+    def spy(*args):
+        results.append(append(*args))
+        return results[-1]
+
+    monkeypatch.setattr(data, "_append", spy)
+    return results
+
+
+def _write(path, lines, mode="wb"):
+    with open(path, mode) as f:
+        f.write(b"".join(lines))
+
+
+def _load(path, selection=None):
+    return data.load_cube(selection, path=path, url=None)
+
+
+def _assert_same(cube, expected):
+    assert cube.n_rows == expected.n_rows
+    for dim in schema.QUESTIONS:
+        pd.testing.assert_series_equal(cube.counts(dim), expected.counts(dim))
+    for index, columns in CROSSTABS:
+        pd.testing.assert_frame_equal(cube.crosstab(index, columns), expected.crosstab(index, columns))
+    assert cube.mean("sleep_hours_numeric") == pytest.approx(expected.mean("sleep_hours_numeric"))
+    pd.testing.assert_frame_equal(
+        cube.mean("performance_numeric", "concentration", "fatigue"),
+        expected.mean("performance_numeric", "concentration", "fatigue"),
+    )
+
+
+def _reloaded(path, selection=None):
+    """Cube and rows of ``path`` loaded from scratch."""
+    data.clear_cache()
+    return _load(path, selection), data.load_rows(selection, path=path, url=None)
+
+
+# --- Append mode ---
+@pytest.mark.parametrize("selection", [None, SELECTION], ids=["all", "filtered"])
+def test_append_matches_full_reload(survey, appends, selection):
+    path, lines = survey
+    half = len(lines) // 2
+    # build both views (and their tables) before the file grows
+    for cube in (_load(path), _load(path, SELECTION)):
+        _assert_same(cube, cube)
+    _write(path, lines[half:], mode="ab")
+
+    cube = _load(path, selection)
+    rows = data.load_rows(selection, path=path, url=None)
+    assert appends == [True]
+    assert data.dataset_version(path=path, url=None) == data.file_hash(path)
+
+    expected, expected_rows = _reloaded(path, selection)
+    _assert_same(cube, expected)
+    pd.testing.assert_frame_equal(rows.reset_index(drop=True), expected_rows.reset_index(drop=True))
+
+
+def test_partial_line_waits_until_complete(survey, appends):
+    path, lines = survey
+    half = len(lines) // 2
+    before = _load(path).n_rows
+    partial = lines[half][:10]
+    _write(path, [lines[half + 1], partial], mode="ab")
+
+    assert _load(path).n_rows == before + 1
+    assert data.dataset_version(path=path, url=None) != data.file_hash(path)
+
+    _write(path, [lines[half][10:]], mode="ab")
+    cube = _load(path)
+    assert appends == [True, True]
+    assert cube.n_rows == before + 2
+    assert data.dataset_version(path=path, url=None) == data.file_hash(path)
+    _assert_same(cube, _reloaded(path)[0])
+
+
+@pytest.mark.parametrize("row", [1, -1], ids=["first", "last"])
+def test_rewritten_rows_reload_in_full(survey, appends, row):
+    path, lines = survey
+    half = len(lines) // 2
+    _load(path, SELECTION)
+    # same length, so only the contents tell the rewrite apart from an append
+    rows = lines[1:half]
+    replacement = next(line for line in rows if len(line) == len(rows[row]) and line != rows[row])
+    rows[row] = replacement
+    _write(path, [lines[0], *rows, *lines[half:]])
+
+    cube = _load(path, SELECTION)
+    assert appends == [False]
+    assert data.dataset_version(path=path, url=None) == data.file_hash(path)
+    _assert_same(cube, _reloaded(path, SELECTION)[0])
+
+
+# --- Staged reloads ---
+def _read_elsewhere(path):
+    """``(version, n_rows)`` as another thread (a session) sees them."""
+    seen = []
+
+    def read():
+        seen.append((data.dataset_version(path=path, url=None), _load(path).n_rows))
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    return seen[0]
+
+
+def test_staged_reload_publishes_on_exit(survey, appends):
+    path, lines = survey
+    half = len(lines) // 2
+    published = _load(path)
+    view = _load(path, SELECTION)
+    old = (data.dataset_version(path=path, url=None), published.n_rows)
+    mask = data._cache[path]["views"][data.selection_key(SELECTION)]["mask"]
+    old_mask = mask.copy()
+    data.set_scheduled(True)
+    _write(path, lines[half:], mode="ab")
+
+    with data.staged_reload(path=path, url=None) as version:
+        assert version == data.file_hash(path)
+        assert appends == [True]
+        # this thread reads the staged version, every other one the published one
+        assert _load(path).n_rows == len(lines) - 1
+        assert _read_elsewhere(path) == old
+    assert _read_elsewhere(path) == (version, len(lines) - 1)
+
+    # the cubes and masks handed out before were never updated in place
+    assert (published.n_rows, len(data.load_rows(path=path, url=None))) == (old[1], len(lines) - 1)
+    assert view.n_rows == int(old_mask.sum())
+    np.testing.assert_array_equal(mask, old_mask)
+    _assert_same(_load(path, SELECTION), _reloaded(path, SELECTION)[0])
+
+
+def test_staged_reload_discards_on_error(survey):
+    path, lines = survey
+    old = (data.dataset_version(path=path, url=None), _load(path).n_rows)
+    data.set_scheduled(True)
+    _write(path, lines[len(lines) // 2:], mode="ab")
+
+    with pytest.raises(RuntimeError):
+        with data.staged_reload(path=path, url=None):
+            raise RuntimeError("warm-up failed")
+    assert _read_elsewhere(path) == old
+    assert (data.dataset_version(path=path, url=None), _load(path).n_rows) == old
+
+
+def test_staged_reload_of_unchanged_source(survey):
+    path, _ = survey
+    _load(path)
+    data.set_scheduled(True)
+    with data.staged_reload(path=path, url=None) as version:
+        assert version is None
@@ -0,0 +1,137 @@
+"""Cube statistics checked against direct computations on the bundled survey rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+import data
+import schema
+from cube import Cube, _bivariate_cdf, _polychoric, _thresholds
+
+# the heatmap's questions plus ones with 2, 4 and 6 levels, so batched pairs get padded
+DIMS = [*analytics.BEHAVIORS, "gender", "year", "sleep_hours"]
+# one whole-survey cube and one over a filtered subset of the rows
+SELECTIONS = [None, {"stress": ["High stress", "Extremely high stress"]}]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return data.prepare(schema.read_csv(data.DATA_FILE))
+
+
+@pytest.fixture(params=SELECTIONS, ids=["all", "stressed"])
+def rows(request, frame):
+    """``(cube, rows)`` for one selection: the cube masks, ``rows`` is the filtered frame."""
+    mask = None
+    if request.param is not None:
+        mask = np.logical_and.reduce([frame[dim].isin(levels) for dim, levels in request.param.items()])
+    cube = Cube(frame, measures=data.MEASURES, mask=mask)
+    return cube, frame if mask is None else frame[mask]
+
+
+def _codes(rows, dim):
+    """Ordinal codes of ``dim`` as floats, NaN for missing answers."""
+    codes = rows[dim].cat.codes.to_numpy().astype("float64")
+    return np.where(codes < 0, np.nan, codes)
+
+
+def _tau_b(x, y):
+    """Kendall's tau-b by comparing every pair of rows."""
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    dx, dy = np.sign(x[:, None] - x[None, :]), np.sign(y[:, None] - y[None, :])
+    upper = np.triu_indices(len(x), k=1)
+    score = (dx * dy)[upper].sum()
+    pairs = len(x) * (len(x) - 1) / 2
+    tied_x, tied_y = (dx[upper] == 0).sum(), (dy[upper] == 0).sum()
+    return score / np.sqrt((pairs - tied_x) * (pairs - tied_y))
+
+
+# --- Correlations ---
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_corr_matches_pandas(rows, method):
+    cube, subset = rows
+    codes = pd.DataFrame({dim: _codes(subset, dim) for dim in DIMS})
+    expected = codes.corr(method=method)
+    pd.testing.assert_frame_equal(cube.corr(DIMS, method=method), expected, check_exact=False, atol=1e-12)
+
+
+def test_kendall_matches_pairwise_count(rows):
+    cube, subset = rows
+    matrix = cube.corr(DIMS, method="kendall")
+    for i, first in enumerate(DIMS):
+        for second in DIMS[i + 1:]:
+            expected = _tau_b(_codes(subset, first), _codes(subset, second))
+            assert matrix.loc[first, second] == pytest.approx(expected, abs=1e-12)
+            assert matrix.loc[second, first] == matrix.loc[first, second]
+
+
+def test_polychoric_maximises_likelihood(rows):
+    cube, _ = rows
+    matrix = cube.corr(DIMS, method="polychoric")
+    grid = np.linspace(-0.999, 0.999, 3997)[None, :]
+    for i, first in enumerate(DIMS):
+        for second in DIMS[i + 1:]:
+            table = cube.counts(first, second).to_numpy(dtype="float64")
+            h, k = _thresholds(table.sum(axis=1)[None]), _thresholds(table.sum(axis=0)[None])
+            cells = np.diff(np.diff(_bivariate_cdf(h, k, grid)[0], axis=1), axis=2)
+            loglik = (table * np.log(np.maximum(cells, 1e-300))).sum(axis=(1, 2))
+            assert matrix.loc[first, second] == pytest.approx(grid[0, loglik.argmax()], abs=1e-3)
+            assert matrix.loc[second, first] == matrix.loc[first, second]
+
+
+def test_bivariate_cdf_matches_monte_carlo():
+    rng = np.random.default_rng(0)
+    h, k = np.array([[-1.0, 0.0, 0.7]]), np.array([[-0.5, 0.3, 1.2]])
+    for rho in (-0.6, 0.0, 0.45, 0.9):
+        latent = rng.multivariate_normal([0, 0], [[1, rho], [rho, 1]], size=400_000)
+        expected = ((latent[:, 0, None, None] <= h[0][:, None]) & (latent[:, 1, None, None] <= k[0][None, :])).mean(axis=0)
+        np.testing.assert_allclose(_bivariate_cdf(h, k, np.array([[rho]]))[0, 0], expected, atol=3e-3)
+
+
+@pytest.mark.parametrize("rho", [-0.5, 0.2, 0.7])
+def test_polychoric_recovers_latent_correlation(rho):
+    rng = np.random.default_rng(1)
+    latent = rng.multivariate_normal([0, 0], [[1, rho], [rho, 1]], size=200_000)
+    # uneven answer levels: four on one question, three on the other
+    x = np.digitize(latent[:, 0], [-0.8, 0.1, 1.0])
+    y = np.digitize(latent[:, 1], [-0.3, 0.6])
+    table = np.zeros((4, 3))
+    np.add.at(table, (x, y), 1)
+    assert _polychoric(table[None])[0] == pytest.approx(rho, abs=0.01)
+
+
+# --- Grouped statistics ---
+def test_box_stats_match_numpy_quantiles(rows):
+    cube, subset = rows
+    stats = cube.box_stats("performance", by="concentration")
+    scores = subset["performance_numeric"]
+    for level, values in scores.groupby(subset["concentration"], observed=True):
+        values = values.dropna().to_numpy()
+        if not len(values):
+            assert level not in stats.index
+            continue
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        row = stats.loc[level]
+        assert row["n"] == len(values)
+        assert row["mean"] == pytest.approx(values.mean())
+        assert (row["q1"], row["median"], row["q3"]) == pytest.approx((q1, median, q3))
+        assert row["lowerfence"] == values[values >= q1 - 1.5 * iqr].min()
+        assert row["upperfence"] == values[values <= q3 + 1.5 * iqr].max()
+
+
+@pytest.mark.parametrize("by", [["year"], ["caffeine", "stress"], ["year", "device_use", "exercise"]])
+def test_group_stats_match_groupby(rows, by):
+    cube, subset = rows
+    stats = cube.group_stats("performance", by)
+    grouped = subset.groupby(by, observed=True)["performance_numeric"]
+    expected = grouped.agg(["count", "mean", "std"])
+    expected = expected[expected["count"] > 0]
+    assert len(stats) == len(expected)
+    stats = stats.loc[expected.index]
+    np.testing.assert_array_equal(stats["n"], expected["count"])
+    np.testing.assert_allclose(stats["mean"], expected["mean"], rtol=1e-12)
+    np.testing.assert_allclose(stats["std"], expected["std"], rtol=1e-9)
+    half_width = 1.959963984540054 * expected["std"] / np.sqrt(expected["count"])
+    np.testing.assert_allclose(stats["ci_high"], expected["mean"] + half_width, rtol=1e-9)
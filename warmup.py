@@ -0,0 +1,167 @@
+"""Background precomputation of every page's aggregates.
+
+``start()`` is called on every rerun from ``app.py`` and does nothing unless
+the dataset version changed since the last warm-up. When it did, a
+background thread computes every metric card and chart dataset in
+``analytics`` (plus the lifestyle correlation for each method, and the
+per-wave facets when waves are registered) for the unfiltered view and for
+each single-level sidebar filter, and installs the
+resulting tables into the shared per-selection cubes in ``data``. First
+visits to a page, and the most common filter clicks, are then answered from
+tables that already exist.
+
+Datasets with at least ``POOL_MIN_ROWS`` rows are warmed on a process pool
+with one worker per core. Each worker memory-maps the columnar cache, builds
+the tables for one selection and sends back a table-only cube. Smaller
+datasets (where starting processes costs more than the work) and streaming
+mode are warmed in the background thread itself.
+
+When a refresh scheduler is configured (``SURVEY_REFRESH_SECONDS``, see
+``refresh``), it warms every version before publishing it, so ``start()``
+only makes sure the scheduler runs.
+
+This module only imports the standard library at import time: ``app.py``
+calls ``start()`` before anything else is loaded, and the data layer,
+pandas and the first CSV load all happen on the warm-up thread.
+"""
+import logging
+import os
+import threading
+
+POOL_MIN_ROWS = int(os.environ.get("SURVEY_WARMUP_POOL_ROWS", 200_000))
+
+_lock = threading.Lock()
+_state = {"version": None, "thread": None}
+_log = logging.getLogger(__name__)
+
+
+def common_selections():
+    """Unfiltered view plus every single-level sidebar filter."""
+    import filters
+    import schema
+
+    return [None] + [{dim: [level]} for dim in filters.FILTERS for level in schema.LEVELS[dim]]
+
+
+def precompute(cube):
+    """Build everything the pages ask of ``cube``; returns the cube."""
+    import analytics
+    import waves
+    from cube import CORRELATION_METHODS
+    from sketch import MetricSketch
+
+    facets = list(cube.facets(waves.COLUMN).values()) if waves.COLUMN in cube.dims else []
+    for target in [cube, *facets]:
+        for fn in [*analytics.METRICS.values(), *analytics.CHARTS.values()]:
+            fn(target)
+        for method in CORRELATION_METHODS:
+            analytics.behavior_correlation(target, method=method)
+    # the 1-D tables behind the metric cards' sketches
+    MetricSketch.of(cube)
+    return cube
+
+
+def _warm_selection(selection, path, registered=(), version=None):
+    """Worker entry point: tables of one selection's cube, without the rows.
+
+    Returns the dataset version the worker read with the tables, or with
+    None when that is not ``version`` (the source changed since the warm-up
+    started), so tables are only ever installed into the rows they describe.
+    """
+    import data
+    import waves
+
+    waves.set_registered(registered)
+    # read the source once: every later read in this worker sees that version
+    data.set_scheduled(True)
+    seen = data.dataset_version(path=path)
+    if version is not None and seen != version:
+        return seen, None
+    return seen, precompute(data.load_cube(selection, path=path)).tables_only()
+
+
+def workers():
+    """Process-pool size: the cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def warm(version=None, selections=None, path=None, url=None):
+    """Precompute ``selections`` (default: ``common_selections()``) for dataset ``version``.
+
+    ``version`` defaults to the version loaded now. Returns how many
+    selections were installed.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    import data
+    import waves
+
+    path, url = path or data.DATA_FILE, url or data.DATA_URL
+    version = version or data.dataset_version(path, url)
+    selections = common_selections() if selections is None else selections
+    cube = data.load_cube(path=path, url=url)
+    pooled = (
+        cube.n_rows >= POOL_MIN_ROWS
+        and not data.is_streaming(path, url)
+        and (os.path.exists(path) or waves.registered())
+        and workers() > 1
+    )
+    if not pooled:
+        for selection in selections:
+            precompute(data.load_cube(selection, path=path, url=url))
+        return len(selections)
+
+    # spawn: forking a process that runs Streamlit's threads is not safe
+    installed = 0
+    pool = ProcessPoolExecutor(max_workers=min(workers(), len(selections)), mp_context=get_context("spawn"))
+    with pool:
+        futures = [
+            pool.submit(_warm_selection, selection, path, waves.registered(), version) for selection in selections
+        ]
+        for selection, future in zip(selections, futures):
+            seen, tables = future.result()
+            # results of another version are skipped; those tables are built on demand
+            if tables is not None:
+                installed += data.adopt_cube(selection, tables, seen, path=path, url=url)
+    return installed
+
+
+def _run():
+    import data
+
+    try:
+        version = data.dataset_version()
+        warm(version)
+    except Exception:
+        # the version stays unrecorded, so the next rerun starts another attempt
+        _log.exception("Background warm-up failed")
+        return
+    with _lock:
+        _state["version"] = version
+
+
+def start():
+    """Warm the caches in the background if the dataset changed since the last run.
+
+    The first call returns at once and loads the data on the warm-up
+    thread; later calls compare the (then cheap) dataset version.
+    """
+    import refresh
+
+    if refresh.interval():
+        return refresh.start()
+    with _lock:
+        thread = _state["thread"]
+        if thread is not None and thread.is_alive():
+            return thread
+        if thread is not None:
+            import data
+
+            if data.dataset_version() == _state["version"]:
+                return thread
+        thread = _state["thread"] = threading.Thread(target=_run, name="survey-warmup", daemon=True)
+    thread.start()
+    return thread
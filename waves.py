@@ -0,0 +1,58 @@
+"""Survey waves: one export per semester, compared on the same pages.
+
+Waves are registered in order with ``register(name, path)`` or through the
+``SURVEY_WAVES`` environment variable::
+
+    SURVEY_WAVES="Fall 2024=/data/fall_2024.csv;Spring 2025=/data/spring_2025.csv"
+
+While any are registered, the data layer serves all of them as one table
+(see ``data``) with a ``wave`` column in place of the default dataset, and
+the sidebar offers a "Compare by wave" facet on every chart.
+
+Only the standard library is imported here, so the sidebar can list the
+waves before pandas is loaded.
+"""
+import os
+
+# Category column holding each row's wave
+COLUMN = "wave"
+ENV_VAR = "SURVEY_WAVES"
+
+# wave name -> CSV path, in registration (chronological) order
+_waves = {}
+
+
+def _parse(spec):
+    waves = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        name, sep, path = item.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"Invalid {ENV_VAR} entry {item!r}; expected 'name=path'")
+        waves[name.strip()] = os.path.abspath(path.strip())
+    return waves
+
+
+def register(name, path):
+    """Add (or move to the end) wave ``name`` read from the CSV at ``path``."""
+    _waves.pop(name, None)
+    _waves[name] = os.path.abspath(path)
+
+
+def set_registered(waves):
+    """Replace every registered wave with ``(name, path)`` pairs."""
+    _waves.clear()
+    for name, path in waves:
+        register(name, path)
+
+
+def registered():
+    """``(name, path)`` of every registered wave, in order."""
+    return list(_waves.items())
+
+
+def names():
+    """Registered wave names, in order."""
+    return list(_waves)
+
+
+_waves.update(_parse(os.environ.get(ENV_VAR, "")))